@@ -31,10 +31,8 @@ Supported MB versions:
 2010
 '''
 import sys
-from cStringIO import StringIO
 
 from pyfbsdk import FBSystem
-from pythonidelib import GenDoc
 
 from datatypes import insertMathClasses
 from core import *
@@ -50,9 +48,10 @@ insertMathClasses()
 ################################
 # set up help                  #
 ################################
-_stdout = sys.stdout
 def help(topic):
     '''Creates a window that displays help information'''
+    from cStringIO import StringIO
+    from pythonidelib import GenDoc
     from pyfbsdk import FBAddRegionParam, FBAttachType, FBMemo, ShowTool
     from pyfbsdk_additions import CreateUniqueTool
     
@@ -73,10 +72,14 @@ def help(topic):
     
     ShowTool(win)
     
+    # capture the doc output in a local stream and put back whatever
+    # stdout was when help was called
+    stream = StringIO()
+    stdout = sys.stdout
+    sys.stdout = stream
     try:
-        sys.stdout = StringIO()
         GenDoc(topic)
-        helpText.Text = sys.stdout.getvalue()
     finally:
-        sys.stdout = _stdout
+        sys.stdout = stdout
+    helpText.Text = stream.getvalue()
     
\ No newline at end of file
@@ -20,6 +20,7 @@ Component module
 Contains component classes and related functions
 '''
 import re
+import weakref
 
 from pyfbsdk import FBComponent
 from pyfbsdk import FBPropertyType
@@ -27,24 +28,42 @@ from pyfbsdk import FBMatrix
 from pyfbsdk import FBVector3d
 from pyfbsdk import FBModelTransformationMatrix
 from pyfbsdk import FBNamespaceAction
+from pyfbsdk import FBConstraint
+
+# namespace actions
+_kConcatNamespace = FBNamespaceAction.kFBConcatNamespace
+_kReplaceNamespace = FBNamespaceAction.kFBReplaceNamespace
+_kRemoveAllNamespace = FBNamespaceAction.kFBRemoveAllNamespace
+
+# model vector types used by the translation, rotation and scale functions
+_kModelTranslation = FBModelTransformationMatrix.kModelTranslation
+_kModelRotation = FBModelTransformationMatrix.kModelRotation
+_kModelScaling = FBModelTransformationMatrix.kModelScaling
+
+# wrappers that are still in use {id(component) : PMB object}
+# the wrapper keeps its component alive so the id can not be reused while it is cached
+_kWrapperCache = weakref.WeakValueDictionary()
+
+# PyMoBu classes by the name of the class they wrap {FB class name : PMB class}, filled in on first use
+_kPyMoBuClasses = {}
 
 def ConvertToPyMoBu(component):
     '''Utility to convert a FB class to a PMB class'''
     if isinstance(component, PMBComponent):
         return component
     
-    # get the first two inherited classes
-    componentClasses = component.__class__.__mro__
+    # the constraint classes are imported at the end of this module so the
+    # table is built the first time it is needed, once they all exist
+    if not _kPyMoBuClasses:
+        for name, obj in globals().items():
+            if name.startswith('PMB') and isinstance(obj, type):
+                _kPyMoBuClasses[name.replace('PMB', 'FB', 1)] = obj
     
-    for fbClass in componentClasses:
-        pmbClassName = fbClass.__name__.replace('FB', 'PMB')
-    
-        try:
-            pmbClass = eval(pmbClassName)
-        except:
-            continue
-        
-        return pmbClass.Convert(component)
+    # use the closest inherited class that has a PyMoBu class
+    for fbClass in component.__class__.__mro__:
+        pmbClass = _kPyMoBuClasses.get(fbClass.__name__)
+        if pmbClass is not None:
+            return pmbClass.Convert(component)
     
 # add this function to FBComponent
 FBComponent.ConvertToPyMoBu = ConvertToPyMoBu    
@@ -55,38 +74,56 @@ FBComponent.ConvertToPyMoBu = ConvertToPyMoBu
 class PMBComponent(object):
     '''PyMoBu class for FBComponent'''
     
-    # property type dictionary {Name : [enum, internal name]}
-    kPropertyTypes = dict(Action = [FBPropertyType.kFBPT_Action, 'Action'],
-                          Enum = [FBPropertyType.kFBPT_enum, 'Enum'],
-                          Integer = [FBPropertyType.kFBPT_int,'Integer'],
-                          Bool = [FBPropertyType.kFBPT_bool,'Bool'],
-                          Double = [FBPropertyType.kFBPT_double,'Number'],
-                          CharPtr = [FBPropertyType.kFBPT_charptr, 'String'],
-                          Float = [FBPropertyType.kFBPT_float,'Float'],
-                          Time = [FBPropertyType.kFBPT_Time, 'Time'],
-                          Object = [FBPropertyType.kFBPT_object, 'Object'],
-                          StringList = [FBPropertyType.kFBPT_stringlist, 'StringList'],
-                          Vector4D = [FBPropertyType.kFBPT_Vector4D, 'Vector'],
-                          Vector3D = [FBPropertyType.kFBPT_Vector3D, 'Vector'],
-                          Vector2D = [FBPropertyType.kFBPT_Vector2D, 'Vector'],
-                          ColorRGB = [FBPropertyType.kFBPT_ColorRGB, 'Color'],
-                          ColorRGBA = [FBPropertyType.kFBPT_ColorRGBA, 'ColorAndAlpha'],
-                          TimeSpan = [FBPropertyType.kFBPT_TimeSpan, 'Time'])
+    # the wrappers only hold on to the component so there is no need for
+    # a dictionary on every instance
+    __slots__ = ('component', '_isConstraint', '_propCache', '_nameAttr', '__weakref__')
+    
+    # property type dictionary {Name : (enum, internal name)}
+    kPropertyTypes = dict(Action = (FBPropertyType.kFBPT_Action, 'Action'),
+                          Enum = (FBPropertyType.kFBPT_enum, 'Enum'),
+                          Integer = (FBPropertyType.kFBPT_int, 'Integer'),
+                          Bool = (FBPropertyType.kFBPT_bool, 'Bool'),
+                          Double = (FBPropertyType.kFBPT_double, 'Number'),
+                          CharPtr = (FBPropertyType.kFBPT_charptr, 'String'),
+                          Float = (FBPropertyType.kFBPT_float, 'Float'),
+                          Time = (FBPropertyType.kFBPT_Time, 'Time'),
+                          Object = (FBPropertyType.kFBPT_object, 'Object'),
+                          StringList = (FBPropertyType.kFBPT_stringlist, 'StringList'),
+                          Vector4D = (FBPropertyType.kFBPT_Vector4D, 'Vector'),
+                          Vector3D = (FBPropertyType.kFBPT_Vector3D, 'Vector'),
+                          Vector2D = (FBPropertyType.kFBPT_Vector2D, 'Vector'),
+                          ColorRGB = (FBPropertyType.kFBPT_ColorRGB, 'Color'),
+                          ColorRGBA = (FBPropertyType.kFBPT_ColorRGBA, 'ColorAndAlpha'),
+                          TimeSpan = (FBPropertyType.kFBPT_TimeSpan, 'Time'))
     
     def __init__(self, component):
         self.component = component
+        # constraints have no hierarchy for the namespace functions
+        self._isConstraint = isinstance(component, FBConstraint)
+        # name attribute with the namespace if the component has one
+        if hasattr(component, 'LongName'):
+            self._nameAttr = 'LongName'
+        else:
+            self._nameAttr = 'Name'
+        # properties already found by name {name : FBProperty}
+        self._propCache = {}
 
     def __repr__(self):
-        name  = getattr(self.component, 'LongName', self.component.Name)
+        name  = getattr(self.component, self._nameAttr)
         return "<%s('%s')>" % (self.__class__.__name__, name)
     
     def __str__(self):
         '''Returns the full object name'''
-        return getattr(self.component, 'LongName', self.component.Name)
+        return getattr(self.component, self._nameAttr)
     
     @classmethod
     def Convert(cls, component):
-        return cls(component)
+        # hand back the existing wrapper if the component is already wrapped
+        key = id(component)
+        pmbComponent = _kWrapperCache.get(key)
+        if pmbComponent is None or pmbComponent.__class__ is not cls:
+            pmbComponent = _kWrapperCache[key] = cls(component)
+        return pmbComponent
                 
     def ListProperties(self, pattern=None, type=None, **kwargs):
         '''
@@ -105,48 +142,62 @@ class PMBComponent(object):
         IsReferenceProperty
         IsUserProperty
         '''
-        # setup a test for the optional parameters
-        def passesOptionalTest(x):
-            for arg, challenge in kwargs.iteritems():
-                func = getattr(x, arg, None)
-                if func and func() != challenge:
-                    return False
-            return True
-            
+        # with nothing to test only the odd None items need to be removed
+        if not pattern and not type and not kwargs:
+            return [p for p in self.component.PropertyList if p is not None]
+        
+        # resolve all of the tests before the loop so each property only
+        # goes through attribute reads and compares instead of function calls
+        optionalTests = kwargs.items()
+        
+        # the methods for the optional tests can live on a subclass of
+        # FBProperty (IsAnimated) so they are looked up on each property
+        # class once and kept {(class, name) : method or None}
+        testMethods = {}
+        
         # set up the name testing based on the pattern
-        if pattern:           
-            # if there is a wild card in the pattern
-            if '*' in pattern:
-                pattern = pattern.replace('*', '.*')
-                # name testing function
-                matchExp = re.compile(pattern)
-                passesNameTest = lambda x: matchExp.match(x.GetName())
-            else:
-                passesNameTest = lambda x: pattern == x.GetName()      
-        else:
-            passesNameTest = lambda x: True
+        nameMatch = None
+        if pattern and '*' in pattern:
+            # compiled once here rather than for each property
+            nameMatch = re.compile(pattern.replace('*', '.*')).match
         
         # add type testing
+        propertyType = None
         if type:
             propertyType = self.kPropertyTypes[type][0]
-            passesTypeTest = lambda x: x.GetPropertyType() == propertyType
-        else:
-            passesTypeTest = lambda x: True
             
         properties = []
+        append = properties.append
         for p in self.component.PropertyList:
             # odd bug that some items are None
             if p is None:
                 continue
             
-            if not passesOptionalTest(p):
+            if optionalTests:
+                cls = p.__class__
+                failed = False
+                for arg, challenge in optionalTests:
+                    key = (cls, arg)
+                    try:
+                        func = testMethods[key]
+                    except KeyError:
+                        func = testMethods[key] = getattr(cls, arg, None)
+                    if func and func(p) != challenge:
+                        failed = True
+                        break
+                if failed:
+                    continue
+            
+            if type and p.GetPropertyType() != propertyType:
                 continue
             
-            if not passesTypeTest(p):
+            if nameMatch:
+                if not nameMatch(p.GetName()):
+                    continue
+            elif pattern and pattern != p.GetName():
                 continue
             
-            if passesNameTest(p):
-                properties.append(p)
+            append(p)
         
         return properties
     
@@ -165,39 +216,48 @@ class PMBComponent(object):
         @param type: the data type of the property:   
         '''
         
-        if self.ListProperties(pattern=name):
-            raise Exception("Can not add property '%s'. Already exists on object '%'" % (name, self))
-        try:
-            typeData = self.kPropertyTypes[type]
-        except KeyError:
+        if self.component.PropertyList.Find(name):
+            raise Exception("Can not add property '%s'. Already exists on object '%s'" % (name, self))
+        typeData = self.kPropertyTypes.get(type)
+        if typeData is None:
             raise Exception("Invalid property type '%s'. Valid types are: '%s'" % (type, ', '.join(self.kPropertyTypes.keys())))
+        propertyType, internalName = typeData
         
-        typeData.extend([animatable, user, None])
-        
-        self.component.PropertyCreate(name, *typeData)
+        self.component.PropertyCreate(name, propertyType, internalName, animatable, user, None)
     
     def RemoveProperty(self, name):
         '''Remove a property from an object'''
         property = self._findProperty(name)
 # test is we can remove a non-user property or not
         if property.IsUserProperty():
+            self._propCache.pop(name, None)
             self.component.PropertyRemove(property)
         else:
             raise Exception("Property is flagged as non-user. Unable to remove property '%s' from object '%s'" % (name, self))
     
-    def _findProperty(self, name):
+    def _findProperty(self, name, cache=True):
         # similar to the native way but raises and exception if property isn't found
+        # found properties are kept so the PropertyList is only searched once per name
+        # @param cache: False for properties MotionBuilder may remove on its own
+        if cache:
+            property = self._propCache.get(name)
+            if property is not None:
+                return property
+        
         property = self.component.PropertyList.Find(name)
         if property:
+            if cache:
+                self._propCache[name] = property
             return property
         else:
             raise Exception("Could not find property named '%s' for object '%s'" % (name, self))
     
     def GetNamespace(self):
         '''Returns the namespace of the object'''
-        namespace = re.match(".*:", getattr(self.component, 'LongName', self.component.Name))
-        if namespace:
-            return namespace.group()
+        # everything up to and including the last separator
+        namespace, separator, name = getattr(self.component, self._nameAttr).rpartition(':')
+        if separator:
+            return namespace + separator
     
     def AddNamespace(self, namespace, hierarchy=True, toRight=False):
         '''
@@ -205,43 +265,39 @@ class PMBComponent(object):
         @param hierarchy: Apply this action to hierarchy. Default True
         @param toRight: Add namespace to the right of other namespaces. Default False (left)
         '''
-        from pyfbsdk import FBConstraint
-        action = FBNamespaceAction.kFBConcatNamespace
-        if hierarchy and not isinstance(self.component, FBConstraint):
-            self.component.ProcessNamespaceHierarchy(action, namespace, None, toRight)
+        if hierarchy and not self._isConstraint:
+            self.component.ProcessNamespaceHierarchy(_kConcatNamespace, namespace, None, toRight)
         else:
-            self.component.ProcessObjectNamespace(action, namespace, None, toRight)
+            self.component.ProcessObjectNamespace(_kConcatNamespace, namespace, None, toRight)
             
     def SwapNamespace(self, newNamespace, oldNamespace, hierarchy=True):
         '''
         Swaps a new namespace with an existing namespace
         @param hierarchy: Apply this action to hierarchy. Default True
         '''
-        from pyfbsdk import FBConstraint
-        action = FBNamespaceAction.kFBReplaceNamespace
-        if hierarchy and not isinstance(self.component, FBConstraint):
-            self.component.ProcessNamespaceHierarchy(action, newNamespace, oldNamespace)
+        if hierarchy and not self._isConstraint:
+            self.component.ProcessNamespaceHierarchy(_kReplaceNamespace, newNamespace, oldNamespace)
         else:
-            self.component.ProcessObjectNamespace(action, newNamespace, oldNamespace)
+            self.component.ProcessObjectNamespace(_kReplaceNamespace, newNamespace, oldNamespace)
     
     def StripNamespace(self, hierarchy=True):
         '''
         Removes all the namespaces
         @param hierarchy: Apply this action to hierarchy. Default True 
         '''
-        from pyfbsdk import FBConstraint
-        action = FBNamespaceAction.kFBRemoveAllNamespace
-        if hierarchy and not isinstance(self.component, FBConstraint):
-            self.component.ProcessNamespaceHierarchy(action, '')
+        if hierarchy and not self._isConstraint:
+            self.component.ProcessNamespaceHierarchy(_kRemoveAllNamespace, '')
         else:
-            self.component.ProcessObjectNamespace(action, '')
+            self.component.ProcessObjectNamespace(_kRemoveAllNamespace, '')
 
 class PMBBox(PMBComponent):
     '''PyMobu class for FBBox'''
-    pass
+    __slots__ = ()
            
 class PMBModel(PMBBox):
     '''PyMoBu class for FBModel'''
+    __slots__ = ()
+    
     kInverseMatrixTypeDict = dict(Transformation = FBModelTransformationMatrix.kModelInverse_Transformation,
                                   Translation = FBModelTransformationMatrix.kModelInverse_Translation,
                                   Rotation = FBModelTransformationMatrix.kModelInverse_Rotation,
@@ -262,10 +318,10 @@ class PMBModel(PMBBox):
         @param worldSpace: world space matrix (True/False) Default False
         @param type: matrix type (Transformation, Translation, Rotation, Scaling, Center, All)
         '''
-        try:
-            self.component.SetMatrix(matrix, self.kInverseMatrixTypeDict[type], worldSpace)
-        except KeyError:
+        matrixType = self.kInverseMatrixTypeDict.get(type)
+        if matrixType is None:
             raise Exception("Invalid vector type '%s'. Valid types are: %s" % (type, ', '.join(self.kInverseMatrixTypeDict.keys())))
+        self.component.SetMatrix(matrix, matrixType, worldSpace)
         
     def SetMatrix(self, matrix, worldSpace=False, type='Transformation'):
         '''
@@ -273,62 +329,72 @@ class PMBModel(PMBBox):
         @param worldSpace: world space matrix (True/False) Default False
         @param type: matrix type (Transformation, Translation, Rotation, Scaling, Center, All)
         '''
-        try:
-            self.component.SetMatrix(matrix, self.kMatrixTypeDict[type], worldSpace)
-        except KeyError:
+        matrixType = self.kMatrixTypeDict.get(type)
+        if matrixType is None:
             raise Exception("Invalid vector type '%s'. Valid types are: %s" % (type, ', '.join(self.kMatrixTypeDict.keys())))
+        self.component.SetMatrix(matrix, matrixType, worldSpace)
     
-    def GetInverseMatrix(self, worldSpace=False, type='Transformation'):
+    def GetInverseMatrix(self, worldSpace=False, type='Transformation', matrix=None):
         '''
         Get the inverse matrix
         @param worldSpace: world space matrix (True/False) Default False
         @param type: matrix type (Transformation, Translation, Rotation, Scaling, Center, All)
+        @param matrix: optional FBMatrix to fill in and return instead of creating a new one
         ''' 
-        matrix = FBMatrix()
-        try:
-            self.component.GetMatrix(matrix, self.kInverseMatrixTypeDict[type], worldSpace)
-        except KeyError:
+        if matrix is None:
+            matrix = FBMatrix()
+        matrixType = self.kInverseMatrixTypeDict.get(type)
+        if matrixType is None:
             raise Exception("Invalid vector type '%s'. Valid types are: %s" % (type, ', '.join(self.kInverseMatrixTypeDict.keys())))
+        self.component.GetMatrix(matrix, matrixType, worldSpace)
         return matrix
         
-    def GetMatrix(self, worldSpace=False, type='Transformation'):
+    def GetMatrix(self, worldSpace=False, type='Transformation', matrix=None):
         '''
         Get the matrix
         @param worldSpace: world space matrix (True/False) Default False
         @param type: matrix type (Transformation, Translation, Rotation, Scaling, Center, All)
+        @param matrix: optional FBMatrix to fill in and return instead of creating a new one
         ''' 
-        matrix = FBMatrix()
-        try:
-            self.component.GetMatrix(matrix, self.kMatrixTypeDict[type], worldSpace)
-        except KeyError:
+        if matrix is None:
+            matrix = FBMatrix()
+        matrixType = self.kMatrixTypeDict.get(type)
+        if matrixType is None:
             raise Exception("Invalid vector type '%s'. Valid types are: %s" % (type, ', '.join(self.kMatrixTypeDict.keys())))
+        self.component.GetMatrix(matrix, matrixType, worldSpace)
         return matrix
     
-    def GetTranslation(self, worldSpace=False):
+    def GetTranslation(self, worldSpace=False, vector=None):
         '''
         Get translation vector
         @param worldSpace: world space vector (True/False) Default False
+        @param vector: optional FBVector3d to fill in and return instead of creating a new one
         '''
-        vector = FBVector3d()
-        self.component.GetVector(vector, self.kMatrixTypeDict['Translation'], worldSpace)
+        if vector is None:
+            vector = FBVector3d()
+        self.component.GetVector(vector, _kModelTranslation, worldSpace)
         return vector
     
-    def GetRotation(self, worldSpace=False):
+    def GetRotation(self, worldSpace=False, vector=None):
         '''
         Get rotation vector
         @param worldSpace: world space vector (True/False) Default False
+        @param vector: optional FBVector3d to fill in and return instead of creating a new one
         '''
-        vector = FBVector3d()
-        self.component.GetVector(vector, self.kMatrixTypeDict['Rotation'], worldSpace)
+        if vector is None:
+            vector = FBVector3d()
+        self.component.GetVector(vector, _kModelRotation, worldSpace)
         return vector
     
-    def GetScale(self, worldSpace=False):
+    def GetScale(self, worldSpace=False, vector=None):
         '''
         Get scale vector
         @param worldSpace: world space vector (True/False) Default False
+        @param vector: optional FBVector3d to fill in and return instead of creating a new one
         '''
-        vector = FBVector3d()
-        self.component.GetVector(vector, self.kMatrixTypeDict['Scaling'], worldSpace)
+        if vector is None:
+            vector = FBVector3d()
+        self.component.GetVector(vector, _kModelScaling, worldSpace)
         return vector
     
     def SetTranslation(self, vector, worldSpace=False):
@@ -336,21 +402,21 @@ class PMBModel(PMBBox):
         Set the translation vector
         @param worldSpace: world space vector (True/False) Default False
         '''
-        self.component.SetVector(vector, self.kMatrixTypeDict['Translation'], worldSpace)
+        self.component.SetVector(vector, _kModelTranslation, worldSpace)
         
     def SetRotation(self, vector, worldSpace=False):
         '''
         Set the rotation vector
         @param worldSpace: world space vector (True/False) Default False
         '''
-        self.component.SetVector(vector, self.kMatrixTypeDict['Rotation'], worldSpace)
+        self.component.SetVector(vector, _kModelRotation, worldSpace)
         
     def SetScale(self, vector, worldSpace=False):
         '''
         Set the scale vector
         @param worldSpace: world space vector (True/False) Default False
         '''
-        self.component.SetVector(vector, self.kMatrixTypeDict['Scaling'], worldSpace)
+        self.component.SetVector(vector, _kModelScaling, worldSpace)
             
 # import other component modules
 from pymobu.components.constraints import *
@@ -25,37 +25,47 @@ constraint into one of the specific constraint classes.
 You can also create a specific constraint through either the class's
 'Create' method or through the CreateConstraint function.
 '''
+import re
+
 from pyfbsdk import FBConstraintManager
 from pyfbsdk import FBSystem
 from pyfbsdk import FBConstraint
 
 from pymobu.components import PMBBox
+from pymobu.components import _kWrapperCache
+
+# error raised when using an object that was deleted in MotionBuilder
+try:
+    from pyfbsdk import UnboundWrapperError as _UnboundWrapperError
+except ImportError:
+    _UnboundWrapperError = RuntimeError
+
+# one constraint manager is shared by the module
+_kConstraintManager = FBConstraintManager()
 
 # create a dictionary of constraint name / indices
-kConstraintTypes = dict((FBConstraintManager().TypeGetName(i), i) for i in xrange(FBConstraintManager().TypeGetCount()))
+kConstraintTypes = dict((_kConstraintManager.TypeGetName(i), i) for i in xrange(_kConstraintManager.TypeGetCount()))
 
 # -----------------------------------------------------
 # Constraint Utility Functions
 # -----------------------------------------------------
 def GetConstraintByName(name, includeNamespace=True):
     '''Returns a constraint that matches it's long name'''
+    if includeNamespace:
+        nameAttr = 'LongName'
+    else:
+        nameAttr = 'Name'
+    
     for const in FBSystem().Scene.Constraints:
-        if includeNamespace:
-            constraintName = const.LongName
-        else:
-            constraintName = const.Name 
-        if name == constraintName:
+        if name == getattr(const, nameAttr):
             return ConvertToPMBConstraint(const)
 
 def GetConstraintsByType(type):
     '''Returns a list of constraints that are of a given type (Aim, Position, ect)'''
     ret = []
+    descriptionTypes = _kConstraintDescriptionTypes
     for constraint in FBSystem().Scene.Constraints:
-        if not isinstance(constraint, PMBConstraint):
-            classType = getattr(kConstraintClassDict.get(constraint.Description), 'constraintType')
-        else:
-            classType = getattr(constraint, 'constraintType')
-        if classType == type:
+        if descriptionTypes.get(constraint.Description) == type:
             ret.append(ConvertToPMBConstraint(constraint))
     return ret
 
@@ -72,7 +82,7 @@ def CreateConstraint(type, name=None):
     @param name: name to give constraint. Default is used if None 
     '''
     try:
-        constraint = FBConstraintManager().TypeCreateConstraint(kConstraintTypes[type])               
+        constraint = _kConstraintManager.TypeCreateConstraint(kConstraintTypes[type])               
     except KeyError:
         raise Exception("Invalid constraint type '%s'" % type)
     
@@ -85,15 +95,21 @@ def CreateConstraint(type, name=None):
 
 def ConvertToPMBConstraint(constraint):
     '''Converts the given constraint to a PyMoBu constraint type based on constraint description'''
-    if isinstance(constraint, PMBConstraint):
-        return constraint
-    elif isinstance(constraint, FBConstraint):
+    # constraints that are already wrapped get the same wrapper back
+    pmbConstraint = _kWrapperCache.get(id(constraint))
+    if isinstance(pmbConstraint, PMBConstraint):
+        return pmbConstraint
+    
+    if isinstance(constraint, FBConstraint):
         try:
             constClass = kConstraintClassDict[constraint.Description]
-            return constClass(constraint)
+            pmbConstraint = _kWrapperCache[id(constraint)] = constClass(constraint)
+            return pmbConstraint
         except KeyError:
             #logger.warning("Not Implemented: Unable to convert constraint '%s'. No PyMoBu class available" % constraint.LongName)
             return constraint
+    elif isinstance(constraint, PMBConstraint):
+        return constraint
     else:
         raise TypeError("Object is not an instance of FBConstraint. Got '%s' instead." % constraint.__class__.__name__)
 
@@ -103,37 +119,39 @@ FBConstraint.ConvertToPyMoBu = ConvertToPMBConstraint
 # Constraint Functions (used in constraint classes)
 # Not to be used separately
 # -----------------------------------------------------
-@property
-def _AffectXProperty(self):
-    '''Get/set the AffectX property (boolean)'''
-    return self.component.PropertyList.Find("AffectX").Data
-
-@_AffectXProperty.setter
-def _AffectXProperty(self, state):
-    self.component.PropertyList.Find("AffectX").Data = state
-
-@property
-def _AffectYProperty(self):
-    '''Get/set the AffectY property (boolean)'''
-    return self.component.PropertyList.Find("AffectY").Data
-
-@_AffectYProperty.setter
-def _AffectYProperty(self, state):
-    self.component.PropertyList.Find("AffectY").Data = state
-
-@property
-def _AffectZProperty(self):
-    '''Get/set the AffectZ property (boolean)'''
-    return self.component.PropertyList.Find("AffectZ").Data
+class _PropertyAccessor(object):
+    '''
+    Class attribute that gets/sets the data of a constraint property
+    @param name: name of the property in the constraint's PropertyList
+    @param doc: optional docstring for the attribute
+    '''
+    def __init__(self, name, doc=None):
+        self.name = name
+        self.__doc__ = doc or "Get/set the %s property" % name
+    
+    def __get__(self, obj, objType=None):
+        if obj is None:
+            return self
+        return obj._findProperty(self.name).Data
+    
+    def __set__(self, obj, value):
+        obj._findProperty(self.name).Data = value
 
-@_AffectZProperty.setter
-def _AffectZProperty(self, state):
-    self.component.PropertyList.Find("AffectZ").Data = state
+_AffectXProperty = _PropertyAccessor("AffectX", "Get/set the AffectX property (boolean)")
+_AffectYProperty = _PropertyAccessor("AffectY", "Get/set the AffectY property (boolean)")
+_AffectZProperty = _PropertyAccessor("AffectZ", "Get/set the AffectZ property (boolean)")
 
 def _RefFuncIndexWrapper(func, idx, funcName=None, funcDoc=None):
     '''Wraps another function that uses reference indices and returns that function'''
-    def _wrappedFunc(self, *args, **kwargs):
-        return func(self, idx=idx, *args, **kwargs)
+    # functions that only take (self, idx) are called without packing any
+    # arguments, the rest forward them so keyword calls such as
+    # SetConstrainedObject(model=m) keep the wrapped function's names
+    if func.__code__.co_argcount == 2:
+        def _wrappedFunc(self):
+            return func(self, idx)
+    else:
+        def _wrappedFunc(self, *args, **kwargs):
+            return func(self, idx=idx, *args, **kwargs)
     
     _wrappedFunc.__name__ = funcName or func.__name__ 
     _wrappedFunc.__doc__ = funcDoc or func.__doc__
@@ -151,37 +169,70 @@ def _SetSingleRef(self, model, idx):
     
 def _RemoveSingleRef(self, idx):
     '''Removes the constrained object from the constraint'''
-    while self.component.ReferenceGetCount(idx):
-        constrained = _GetSingleRef(self, idx)
-        self.component.ReferenceRemove(idx, constrained)
+    component = self.component
+    while component.ReferenceGetCount(idx):
+        component.ReferenceRemove(idx, component.ReferenceGet(idx))
+    # removing a reference can remove properties that were found before
+    self._propCache.clear()
         
 def _GetMultiRef(self, idx):
     '''Returns a list of objects in the constraint'''
-    return [self.component.ReferenceGet(idx, i) for i in xrange(self.component.ReferenceGetCount(idx))]
+    component = self.component
+    referenceGet = component.ReferenceGet
+    return [referenceGet(idx, i) for i in xrange(component.ReferenceGetCount(idx))]
     
 def _AddMultiRef(self, models, idx):
     '''Adds multiple objects to the constraint'''
-    if not hasattr(models, "__iter__"):
-        models = [models]
+    # lists and tuples are the common case so skip probing them
+    if not isinstance(models, (list, tuple)) and not hasattr(models, "__iter__"):
+        models = (models,)
     
+    referenceAdd = self.component.ReferenceAdd
     for m in models:
-        m = getattr(m, 'component', m)
-        self.component.ReferenceAdd(idx, m)
+        referenceAdd(idx, getattr(m, 'component', m))
     
 def _RemoveMultiRef(self, models, idx):
     '''Removes the given objects from the constraint'''
-    if not hasattr(models, "__iter__"):
-        models = [models]
+    # lists and tuples are the common case so skip probing them
+    if not isinstance(models, (list, tuple)) and not hasattr(models, "__iter__"):
+        models = (models,)
 
+    referenceRemove = self.component.ReferenceRemove
     for m in models:
-        m = getattr(m, 'component', m)
-        self.component.ReferenceRemove(idx, m)
+        referenceRemove(idx, getattr(m, 'component', m))
+    # removing a reference can remove properties that were found before
+    self._propCache.clear()
+
+# reference functions for each binding kind {kind : ((prefix, function, doc), ...)}
+_kRefBindingFunctions = {'single' : (('Set', _SetSingleRef, 'Set the %s'),
+                                     ('Get', _GetSingleRef, 'Get the %s'),
+                                     ('Remove', _RemoveSingleRef, 'Remove the %s')),
+                         'multi' : (('Add', _AddMultiRef, 'Add %s(s)'),
+                                    ('Get', _GetMultiRef, 'Get a list of %s(s)'),
+                                    ('Remove', _RemoveMultiRef, 'Remove %s(s)'))}
+
+class _RefBindingType(type):
+    '''
+    Metaclass that adds the reference methods listed in a class's _refBindings
+    Each binding is (reference name, reference index, 'single' or 'multi')
+    Methods written out in the class itself are left alone
+    '''
+    def __init__(cls, name, bases, dct):
+        super(_RefBindingType, cls).__init__(name, bases, dct)
+        for refName, idx, kind in dct.get('_refBindings', ()):
+            # 'AimAtObject' is described as 'aim at object'
+            label = re.sub('([A-Z])', r' \1', refName).strip().lower()
+            for prefix, func, doc in _kRefBindingFunctions[kind]:
+                funcName = prefix + refName
+                if funcName not in dct:
+                    setattr(cls, funcName, _RefFuncIndexWrapper(func, idx, funcName, doc % label))
     
 # -----------------------------------------------------
 # Unique Constraint Classes
 # -----------------------------------------------------
 class PMBConstraint(PMBBox):
     '''base class for PyMoBu Constraints'''
+    __metaclass__ = _RefBindingType
 
     @classmethod
     def Create(cls, name=None):
@@ -194,15 +245,9 @@ class PMBConstraint(PMBBox):
 
 class ConstrainedSourceMixIn(object):
     '''Mix-in class for the constrained / multiple source constraint types'''
-    # Constrained reference
-    SetConstrainedObject = _RefFuncIndexWrapper(_SetSingleRef, 0, 'SetConstrainedObject')
-    GetConstrainedObject = _RefFuncIndexWrapper(_GetSingleRef, 0, 'GetConstrainedObject')
-    RemoveConstrainedObject = _RefFuncIndexWrapper(_RemoveSingleRef, 0, 'RemoveConstrainedObject')
-    
-    # Source reference
-    GetSourceObject = _RefFuncIndexWrapper(_GetMultiRef, 1, 'GetSourceObject', 'Get a list of source objects')
-    AddSourceObject= _RefFuncIndexWrapper(_AddMultiRef, 1, 'AddSourceObject', 'Add source object(s)')
-    RemoveSourceObject = _RefFuncIndexWrapper(_RemoveMultiRef, 1, 'RemoveSourceObject', 'Remove source object(s)')
+    __metaclass__ = _RefBindingType
+    _refBindings = (('ConstrainedObject', 0, 'single'),
+                    ('SourceObject', 1, 'multi'))
     
 class PMBCharacter(PMBConstraint):
     '''PyMoBu Character Class'''
@@ -216,12 +261,23 @@ class PMBCharacter(PMBConstraint):
         '''
         Returns list of character mapping slots
         @param returnNames: True/False to return the character slot name, otherwise the property object is returned'''
-        slots = self.ListProperties(pattern='*Link', type='Object')
+        # walk the property list directly, testing the name before the type
+        objectType = self.kPropertyTypes['Object'][0]
+        slots = []
+        append = slots.append
+        for p in self.component.PropertyList:
+            # odd bug that some items are None
+            if p is None:
+                continue
+            name = p.GetName()
+            # same as the '*Link' pattern, which matches Link anywhere in the name
+            if 'Link' in name and p.GetPropertyType() == objectType:
+                if returnNames:
+                    append(name)
+                else:
+                    append(p)
         
-        if returnNames:
-            return map(lambda x: x.GetName(), slots)
-        else:
-            return slots
+        return slots
      
     def ExportMapping(self, filePath, stripPrefix=None):
         '''
@@ -233,9 +289,8 @@ class PMBCharacter(PMBConstraint):
         
         mapping = self.GetCharacterMapping(True, False, stripPrefix)
         
-        dumpFile = file(filePath, "w")
-        pickle.dump(mapping, dumpFile, 0)
-        dumpFile.close()
+        with file(filePath, "wb") as dumpFile:
+            pickle.dump(mapping, dumpFile, pickle.HIGHEST_PROTOCOL)
         
     def ImportMapping(self, filePath, addPrefix=None, haltOnError=True):
         '''
@@ -246,14 +301,27 @@ class PMBCharacter(PMBConstraint):
         '''
         import cPickle as pickle
         
-        with file(filePath) as pickleFile:
-            dumpData = pickle.load(pickleFile)
+        with file(filePath, "rb") as pickleFile:
+            data = pickleFile.read()
+        
+        # older mappings were saved as text so the line endings may need fixing
+        if not data.startswith('\x80'):
+            data = data.replace('\r\n', '\n')
+        dumpData = pickle.loads(data)
+        
+        # index the scene models by long name once rather than searching
+        # the scene for the model of every slot
+        from pyfbsdk import FBModel
+        modelIndex = {}
+        for cmpnt in FBSystem().Scene.Components:
+            if isinstance(cmpnt, FBModel):
+                modelIndex.setdefault(cmpnt.LongName, cmpnt)
         
         for slot, model in dumpData.iteritems():
             if model and addPrefix:
                 model = addPrefix + model
             try:
-                self.SetSlotModel(slot, model)
+                self.SetSlotModel(slot, model, _modelIndex=modelIndex)
             except:
                 if haltOnError:
                     raise
@@ -269,29 +337,42 @@ class PMBCharacter(PMBConstraint):
         '''Removes the model from the given slot'''
         self.SetSlotModel(slot, None)
         
-    def SetSlotModel(self, slot, model):
+    def SetSlotModel(self, slot, model, _modelIndex=None):
         '''
         Adds a model to a slot in the characterization map
         @param slot: full name of character slot
         @param model: model to add to the slot (can be name or model object)
+        @param _modelIndex: optional dictionary of models by long name to search before the scene
         '''
         from pyfbsdk import FBFindModelByName
+        from pyfbsdk import FBPropertyListObject
         if isinstance(model, basestring):
-            obj = FBFindModelByName(model)
+            obj = None
+            if _modelIndex is not None:
+                obj = _modelIndex.get(model)
+            if not obj:
+                obj = FBFindModelByName(model)
             if not obj:
                 raise Exception("Object '%s' does not exist. Unable to add it to character map '%s' under slot '%s'" % (model, self, slot))
         else:
             obj = getattr(model, 'component', model)
                  
-        # get the character slot
-        charSlot = self.ListProperties(pattern=slot)
-        if not charSlot:
-            raise Exception("Invalid character slot '%s'" % slot)
+        # get the character slot, either the property itself, the full
+        # slot name or the slot name without the 'Link' suffix
+        if isinstance(slot, FBPropertyListObject):
+            charSlot = slot
+        else:
+            propertyList = self.component.PropertyList
+            charSlot = propertyList.Find(slot)
+            if not isinstance(charSlot, FBPropertyListObject):
+                charSlot = propertyList.Find(slot + 'Link')
+                if not isinstance(charSlot, FBPropertyListObject):
+                    raise Exception("Invalid character slot '%s'" % slot)
         # remove all current models from the slot
-        charSlot[0].removeAll()
+        charSlot.removeAll()
         
         if obj:
-            charSlot[0].append(obj)
+            charSlot.append(obj)
     
     def GetCharacterMapping(self, returnNames=True, skipEmpty=True, stripPrefix=None):
         '''
@@ -304,13 +385,14 @@ class PMBCharacter(PMBConstraint):
                 
         mapping = {}
         for slot in charSlots:
-            if not len(slot):
+            # most slots are filled so reading the first model and catching
+            # the empty ones saves asking every slot for its length
+            try:
+                model = slot[0]
+            except IndexError:
                 if skipEmpty:
                     continue
-                else:
-                    model = None
-            else:
-                model = slot[0]
+                model = None
             
             if returnNames:
                 slot = slot.GetName()
@@ -327,59 +409,47 @@ class PMBAimConstraint(PMBConstraint):
     '''Aim constraint class'''
     constraintType = 'Aim'
     kWorldUpType = {"Scene Up" : 0, "Object Up" : 1, "Object Rotation Up" : 2, "Vector" : 3, "None" : 4}
+    # reverse lookup of the above {index : name}
+    _kWorldUpTypeNames = dict((i, t) for t, i in kWorldUpType.iteritems())
     
-    # Constrained reference
-    SetConstrainedObject = _RefFuncIndexWrapper(_SetSingleRef, 0, 'SetConstrainedObject')
-    GetConstrainedObject = _RefFuncIndexWrapper(_GetSingleRef, 0, 'GetConstrainedObject')
-    RemoveConstrainedObject = _RefFuncIndexWrapper(_RemoveSingleRef, 0, 'RemoveConstrainedObject')
-    
-    # Aim at reference
-    AddAimAtObject = _RefFuncIndexWrapper(_AddMultiRef, 1, 'AddAimAtObject', 'Add aim at object(s)')
-    GetAimAtObject = _RefFuncIndexWrapper(_GetMultiRef, 1, 'GetAimAtObject', 'Get a list of aim at objects')
-    RemoveAimAtObject = _RefFuncIndexWrapper(_RemoveMultiRef, 1, 'RemoveAimAtObject', 'Remove aim at object(s)')
-    
-    # World up reference
-    SetWorldUpObject = _RefFuncIndexWrapper(_SetSingleRef, 2, 'SetWorldUpObject', 'Set the world up object')
-    GetWorldUpObject = _RefFuncIndexWrapper(_GetSingleRef, 2, 'GetWorldUpObjet', 'Get the world up object')
-    RemoveWorldUpObject = _RefFuncIndexWrapper(_RemoveSingleRef, 2, 'RemoveWorldUpObject', 'Remove the world up object')
+    _refBindings = (('ConstrainedObject', 0, 'single'),
+                    ('AimAtObject', 1, 'multi'),
+                    ('WorldUpObject', 2, 'single'))
                    
     def SetWorldUpType(self, type):
         '''Sets the world up type'''
         try:
-            self.component.PropertyList.Find("WorldUpType").Data = self.kWorldUpType[type]
+            self._findProperty("WorldUpType").Data = self.kWorldUpType[type]
         except KeyError:
             raise Exception("Invalid world up type '%s'" % type)
     
     def GetWorldUpType(self):
         '''Returns the world up type'''
-        type = self.component.PropertyList.Find("WorldUpType").Data
-        for t, i in self.kWorldUpType.iteritems():
-            if i == type:
-                return t 
+        return self._kWorldUpTypeNames[self._findProperty("WorldUpType").Data]
     
     def GetUpVector(self):
         '''Returns the up vector'''
-        return self.component.PropertyList.Find("UpVector").Data
+        return self._findProperty("UpVector").Data
     
     def SetUpVector(self, vector):
         '''Sets the up vector'''
-        self.component.PropertyList.Find("UpVector").Data = vector
+        self._findProperty("UpVector").Data = vector
     
     def GetRotationOffset(self):
         '''Get the rotation offset vector'''
-        return self.component.PropertyList.Find("RotationOffset").Data
+        return self._findProperty("RotationOffset").Data
     
     def SetRotationOffset(self, vector):
         '''Set the rotation offset vector'''
-        self.component.PropertyList.Find("RotationOffset").Data = vector
+        self._findProperty("RotationOffset").Data = vector
     
     def GetAimVector(self):
         '''Get the aim vector'''
-        return self.component.PropertyList.Find("AimVector").Data
+        return self._findProperty("AimVector").Data
     
     def SetAimVector(self, vector):
         '''Set the aim vector'''
-        self.component.PropertyList.Find("AimVector").Data = vector
+        self._findProperty("AimVector").Data = vector
         
     AffectX = _AffectXProperty
     AffectY = _AffectYProperty
@@ -389,85 +459,16 @@ class PMBParentChildConstraint(ConstrainedSourceMixIn, PMBConstraint):
     '''Parent / child constraint class'''
     constraintType = 'Parent/Child'
     
-    @property
-    def AffectTranslationX(self):
-        return self.component.PropertyList.Find("AffectTranslationX").Data
-    
-    @AffectTranslationX.setter
-    def AffectTranslationX(self, state):
-        self.component.PropertyList.Find("AffectTranslationX").Data = state
-    
-    @property
-    def AffectTranslationY(self):
-        return self.component.PropertyList.Find("AffectTranslationY").Data
-    
-    @AffectTranslationY.setter
-    def AffectTranslationY(self, state):
-        self.component.PropertyList.Find("AffectTranslationY").Data = state
-    
-    @property
-    def AffectTranslationZ(self):
-        return self.component.PropertyList.Find("AffectTranslationZ").Data
-    
-    @AffectTranslationZ.setter
-    def AffectTranslationZ(self, state):
-        self.component.PropertyList.Find("AffectTranslationZ").Data = state
-
-    @property
-    def AffectRotationX(self):
-        return self.component.PropertyList.Find("AffectRotationX").Data
-    
-    @AffectRotationX.setter
-    def AffectRotationX(self, state):
-        self.component.PropertyList.Find("AffectRotationX").Data = state
-    
-    @property
-    def AffectRotationY(self):
-        return self.component.PropertyList.Find("AffectRotationY").Data
-    
-    @AffectRotationY.setter
-    def AffectRotationY(self, state):
-        self.component.PropertyList.Find("AffectRotationY").Data = state
-    
-    @property
-    def AffectRotationZ(self):
-        return self.component.PropertyList.Find("AffectRotationZ").Data
-    
-    @AffectRotationZ.setter
-    def AffectRotationZ(self, state):
-        self.component.PropertyList.Find("AffectRotationZ").Data = state 
-    
-    @property
-    def AffectScalingX(self):
-        return self.component.PropertyList.Find("AffectScalingX").Data
-    
-    @AffectScalingX.setter
-    def AffectScalingX(self, state):
-        self.component.PropertyList.Find("AffectScalingX").Data = state
-    
-    @property
-    def AffectScalingY(self):
-        return self.PropertyList.Find("AffectScalingY").Data
-    
-    @AffectScalingY.setter
-    def AffectScalingY(self, state):
-        self.component.PropertyList.Find("AffectScalingY").Data = state
-    
-    @property
-    def AffectScalingZ(self):
-        return self.component.PropertyList.Find("AffectScalingZ").Data
-    
-    @AffectScalingZ.setter
-    def AffectScalingZ(self, state):
-        self.component.PropertyList.Find("AffectScalingZ").Data = state
-    
-    @property
-    def ScalingAffectsTranslation(self):
-        return self.component.PropertyList.Find("ScalingAffectsTranslation").Data
-        
-    @ScalingAffectsTranslation.setter
-    def ScalingAffectsTranslation(self, state):
-        self.component.PropertyList.Find("ScalingAffectsTranslation").Data = state
+    AffectTranslationX = _PropertyAccessor("AffectTranslationX")
+    AffectTranslationY = _PropertyAccessor("AffectTranslationY")
+    AffectTranslationZ = _PropertyAccessor("AffectTranslationZ")
+    AffectRotationX = _PropertyAccessor("AffectRotationX")
+    AffectRotationY = _PropertyAccessor("AffectRotationY")
+    AffectRotationZ = _PropertyAccessor("AffectRotationZ")
+    AffectScalingX = _PropertyAccessor("AffectScalingX")
+    AffectScalingY = _PropertyAccessor("AffectScalingY")
+    AffectScalingZ = _PropertyAccessor("AffectScalingZ")
+    ScalingAffectsTranslation = _PropertyAccessor("ScalingAffectsTranslation")
 
 class PMBRotationConstraint(ConstrainedSourceMixIn, PMBConstraint):
     '''Rotation (orientation) constraint class'''
@@ -478,10 +479,10 @@ class PMBRotationConstraint(ConstrainedSourceMixIn, PMBConstraint):
     AffectZ = _AffectZProperty
     
     def GetRotation(self):
-        return self.component.PropertyList.Find('Rotation').Data
+        return self._findProperty('Rotation').Data
     
     def SetRotation(self, vector):
-        self.component.PropertyList.Find('Rotation').Data = vector
+        self._findProperty('Rotation').Data = vector
 
 class PMBPositionConstraint(ConstrainedSourceMixIn, PMBConstraint):
     '''Position (point) constraint class'''
@@ -492,37 +493,36 @@ class PMBPositionConstraint(ConstrainedSourceMixIn, PMBConstraint):
     AffectZ = _AffectZProperty
     
     def GetTranslation(self):
-        return self.component.PropertyList.Find('Translation').Data
+        return self._findProperty('Translation').Data
     
     def SetTranslation(self, vector):
-        self.component.PropertyList.Find('Translation').Data = vector
+        self._findProperty('Translation').Data = vector
 
 class PMBScaleConstraint(ConstrainedSourceMixIn, PMBConstraint):
     '''Scale constraint class'''
     constraintType = 'Scale'
     kBlendMethods = dict(Average = 0, Geometric = 1)
+    # reverse lookup of the above {index : name}
+    _kBlendMethodNames = dict((i, m) for m, i in kBlendMethods.iteritems())
     
     AffectX = _AffectXProperty
     AffectY = _AffectYProperty
     AffectZ = _AffectZProperty
         
     def GetScaling(self):
-        return self.component.PropertyList.Find('Scaling').Data
+        return self._findProperty('Scaling').Data
     
     def SetScaling(self, vector):
-        self.component.PropertyList.Find('Scaling').Data = vector
+        self._findProperty('Scaling').Data = vector
         
     def GetBlendMethod(self):
         '''Get the blend method'''
-        currentMethod = self.component.PropertyList.Find('SourceBlendMode').Data
-        for method, idx in self.kBlendMethods.iteritems():
-            if currentMethod == idx:
-                return method
+        return self._kBlendMethodNames[self._findProperty('SourceBlendMode').Data]
             
     def SetBlendMethod(self, method):
         '''Set the blend method'''
         try:
-            self.component.PropertyList.Find('SourceBlendMode').Data = self.kBlendMethods[method]
+            self._findProperty('SourceBlendMode').Data = self.kBlendMethods[method]
         except KeyError:
             raise Exception("Invalid method '%s'" % method)
 
@@ -530,168 +530,103 @@ class PMBThreePointsConstraint(PMBConstraint):
     '''3 Points constraint class'''
     constraintType = '3 Points'
        
-    # Constrained reference
-    SetConstrainedObject = _RefFuncIndexWrapper(_SetSingleRef, 0, 'SetConstrainedObject')
-    GetConstrainedObject = _RefFuncIndexWrapper(_GetSingleRef, 0, 'GetConstrainedObject')
-    RemoveConstrainedObject = _RefFuncIndexWrapper(_RemoveSingleRef, 0, 'RemoveConstrainedObject')
-    
-    # Origin reference
-    SetOriginObject = _RefFuncIndexWrapper(_SetSingleRef, 1, 'SetOriginObject', 'Set the origin object')
-    GetOriginObject = _RefFuncIndexWrapper(_GetSingleRef, 1, 'GetOriginObject', 'Get the origin object')
-    RemoveOriginObject = _RefFuncIndexWrapper(_RemoveSingleRef, 1, 'RemoveOriginObject', 'Remove the origin object')
-    
-    # Target reference
-    SetTargetObject = _RefFuncIndexWrapper(_SetSingleRef, 2, 'SetTargetObject', 'Set the target object')
-    GetTargetObject = _RefFuncIndexWrapper(_GetSingleRef, 2, 'GetTargetObject', 'Get the target object')
-    RemoveTargetObject = _RefFuncIndexWrapper(_RemoveSingleRef, 2, 'RemoveTargetObject', 'Remove the target object')
-
-    # Up reference
-    SetUpObject = _RefFuncIndexWrapper(_SetSingleRef, 3, 'SetUpObject', 'Set the up object')
-    GetUpObject = _RefFuncIndexWrapper(_GetSingleRef, 3, 'GetUpObject', 'Get the up object')
-    RemoveUpObject = _RefFuncIndexWrapper(_RemoveSingleRef, 3, 'RemoveUpObject', 'Remove the up object')
+    _refBindings = (('ConstrainedObject', 0, 'single'),
+                    ('OriginObject', 1, 'single'),
+                    ('TargetObject', 2, 'single'),
+                    ('UpObject', 3, 'single'))
 
 class PMBRigidBodyConstraint(ConstrainedSourceMixIn, PMBConstraint):
     '''Rigid Body constraint class'''
     constraintType = 'Rigid Body'
     
-class PMBMappingConstraint(PMBConstraint, FBConstraint):
+class PMBMappingConstraint(PMBConstraint):
     '''Mapping constraint class'''
     constraintType = 'Mapping'
     
-    # Constrained reference
-    SetConstrainedObject = _RefFuncIndexWrapper(_SetSingleRef, 0, 'SetConstrainedObject')
-    GetConstrainedObject = _RefFuncIndexWrapper(_GetSingleRef, 0, 'GetConstrainedObject')
-    RemoveConstrainedObject = _RefFuncIndexWrapper(_RemoveSingleRef, 0, 'RemoveConstrainedObject')
-    
-    # Reference reference
-    SetReferenceObject = _RefFuncIndexWrapper(_SetSingleRef, 1, 'SetReferenceObject', 'Set the reference object')
-    GetReferenceObject = _RefFuncIndexWrapper(_GetSingleRef, 1, 'GetReferenceObject', 'Get the reference object')
-    RemoveReferenceObject = _RefFuncIndexWrapper(_RemoveSingleRef, 1, 'RemoveReferenceObject', 'Remove the reference object')
-            
-    # Source reference
-    SetSourceObject = _RefFuncIndexWrapper(_SetSingleRef, 2, 'SetSourceObject', 'Set the source object')
-    GetSourceObject = _RefFuncIndexWrapper(_GetSingleRef, 2, 'GetSourceObject' , 'Get the source object')
-    RemoveSourceObject = _RefFuncIndexWrapper(_RemoveSingleRef, 2, 'RemoveSourceObject' , 'Remove the source object')
-    
-    # Source reference reference
-    SetSourceReferenceObject = _RefFuncIndexWrapper(_SetSingleRef, 3, 'SetSourceReferenceObject', 'Set the source reference object')
-    GetSourceReferenceObject = _RefFuncIndexWrapper(_GetSingleRef, 3, 'GetSourceReferenceObject', 'Get the source reference object')
-    RemoveSourceReferenceObject = _RefFuncIndexWrapper(_RemoveSingleRef, 3, 'RemoveSourceReferenceObject', 'Remove the source reference object')
+    _refBindings = (('ConstrainedObject', 0, 'single'),
+                    ('ReferenceObject', 1, 'single'),
+                    ('SourceObject', 2, 'single'),
+                    ('SourceReferenceObject', 3, 'single'))
     
 class PMBRangeConstraint(PMBConstraint):
     '''Range constraint class'''
     constraintType = 'Range'
     
-    # Constrained reference
-    SetConstrainedObject = _RefFuncIndexWrapper(_SetSingleRef, 0, 'SetConstrainedObject')
-    GetConstrainedObject = _RefFuncIndexWrapper(_GetSingleRef, 0, 'GetConstrainedObject')
-    RemoveConstrainedObject = _RefFuncIndexWrapper(_RemoveSingleRef, 0, 'RemoveConstrainedObject')
+    _refBindings = (('ConstrainedObject', 0, 'single'),
+                    ('SourceObject', 1, 'single'),
+                    ('PullingObject', 2, 'multi'))
     
-    # Source reference    
-    SetSourceObject = _RefFuncIndexWrapper(_SetSingleRef, 1, 'SetSourceObject', 'Set the source object')
-    GetSourceObject = _RefFuncIndexWrapper(_GetSingleRef, 1, 'GetSourceObject' , 'Get the source object')
-    RemoveSourceObject = _RefFuncIndexWrapper(_RemoveSingleRef, 1, 'RemoveSourceObject' , 'Remove the source object')
-    
-    # Pulling reference
-    AddPullingObject = _RefFuncIndexWrapper(_AddMultiRef, 2, 'AddPullingObject', 'Add pulling object(s)')
-    GetPullingObject = _RefFuncIndexWrapper(_GetMultiRef, 2, 'GetPullingObject', 'Get list of pulling objects')
-    RemovePullingObject = _RefFuncIndexWrapper(_RemoveMultiRef, 2, 'RemovePullingObject', 'Remove pulling object(s)')
-    
-class PMBChainIKConstraint(PMBConstraint, FBConstraint):
+class PMBChainIKConstraint(PMBConstraint):
     '''Chain IK constraint class'''
     constraintType = 'Chain IK'
     kSolverType = dict(ikRPsolver = 0, ikSCsolver = 1)
     kPoleType = dict(Vector = 0, Object = 1)
     kEvalTSAnim = dict(Never = 0, Auto = 1, Always = 2)
-    
-    # First joint reference
-    SetFirstJoint = _RefFuncIndexWrapper(_SetSingleRef, 0, 'SetFirstJoint')
-    GetFirstJoint = _RefFuncIndexWrapper(_GetSingleRef, 0, 'GetFirstJoint')
-    RemoveFirstJoint = _RefFuncIndexWrapper(_RemoveSingleRef, 0, 'RemoveFirstJoint')
-    
-    # End joint reference
-    SetEndJoint = _RefFuncIndexWrapper(_SetSingleRef, 1, 'SetEndJoint')
-    GetEndJoint = _RefFuncIndexWrapper(_GetSingleRef, 1, 'GetEndJoint')
-    RemoveEndJoint = _RefFuncIndexWrapper(_RemoveSingleRef, 1, 'RemoveEndJoint')
-    
-    # Effector reference
-    SetEffector = _RefFuncIndexWrapper(_SetSingleRef, 2, 'SetEffector')
-    GetEffector = _RefFuncIndexWrapper(_GetSingleRef, 2, 'GetEffector')
-    RemoveEffector = _RefFuncIndexWrapper(_RemoveSingleRef, 2, 'RemoveEffector')
-    
-    # Floor reference
-    SetFloor = _RefFuncIndexWrapper(_SetSingleRef, 3, 'SetFloor')
-    GetFloor = _RefFuncIndexWrapper(_GetSingleRef, 3, 'GetFloor')
-    RemoveFloor = _RefFuncIndexWrapper(_RemoveSingleRef, 3, 'RemoveFloor')
-    
-    # Pulling reference
-    AddPoleVectorObject = _RefFuncIndexWrapper(_AddMultiRef, 4, 'AddPullVectorObject')
-    GetPoleVectorObject = _RefFuncIndexWrapper(_GetMultiRef, 4, 'GetPoleVectorObject')
-    RemovePoleVectorObject = _RefFuncIndexWrapper(_RemoveMultiRef, 4, 'RemovePoleVectorObject')
+    # reverse lookups of the above {index : name}
+    _kSolverTypeNames = dict((i, t) for t, i in kSolverType.iteritems())
+    _kPoleTypeNames = dict((i, t) for t, i in kPoleType.iteritems())
+    _kEvalTSAnimNames = dict((i, s) for s, i in kEvalTSAnim.iteritems())
+    
+    _refBindings = (('FirstJoint', 0, 'single'),
+                    ('EndJoint', 1, 'single'),
+                    ('Effector', 2, 'single'),
+                    ('Floor', 3, 'single'),
+                    ('PoleVectorObject', 4, 'multi'))
        
     def GetSolverType(self):
         '''Get the solver type'''
-        solverType = self.component.PropertyList.Find('Solver Type').Data
-        for type, idx in self.kSolverType.iteritems():
-            if solverType == idx:
-                return type
+        return self._kSolverTypeNames[self._findProperty('Solver Type').Data]
 
     def SetSolverType(self, type):
         '''Set the solver type'''
         try:
-            self.component.PropertyList.Find('Solver Type').Data = self.kSolverType[type]
+            self._findProperty('Solver Type').Data = self.kSolverType[type]
         except KeyError:
             raise Exception("Invalid solver type '%s'" % type)
     
     def GetTwist(self):
         '''Get the twist'''
-        return self.component.PropertyList.Find('Twist').Data
+        return self._findProperty('Twist').Data
     
     def SetTwist(self, value):
         '''Set the twist'''
-        self.component.PropertyList.Find('Twist').Data = value
+        self._findProperty('Twist').Data = value
     
     def GetPoleType(self):
         '''Get the pole vector type'''
-        poleVectorType = self.component.PropertyList.Find('PoleVectorType').Data
-        for type, idx in self.kPoleType.iteritems():
-            if poleVectorType == idx:
-                return type
+        return self._kPoleTypeNames[self._findProperty('PoleVectorType').Data]
     
     def SetPoleType(self, type):
         '''Set the pole vector type'''
         try:
-            self.component.PropertyList.Find('PoleVectorType').Data = self.kPoleType[type]
+            self._findProperty('PoleVectorType').Data = self.kPoleType[type]
         except:
             raise Exception("Invalid pole type '%s'" % type)
     
     def GetPoleVector(self):
         '''Get pole vector'''
-        return self.component.PropertyList.Find('PoleVector').Data
+        return self._findProperty('PoleVector').Data
     
     def SetPoleVector(self, vector):
         '''Set the pole vector'''
-        self.component.PropertyList.Find('PoleVector').Data = vector
+        self._findProperty('PoleVector').Data = vector
     
     def GetPoleOffset(self):
         '''Get pole vector offset'''
-        return self.component.PropertyList.Find('PoleVectorOffset').Data
+        return self._findProperty('PoleVectorOffset').Data
     
     def SetPoleOffset(self, vector):
         '''Set the pole vector offset'''
-        self.component.PropertyList.Find('PoleVectorOffset').Data = vector
+        self._findProperty('PoleVectorOffset').Data = vector
     
     def GetEvalTSAnimation(self):
         '''Get the eval ts animation state'''
-        animState = self.component.PropertyList.Find('EvaluateTSAnim').Data
-        for state, idx in self.kEvalTSAnim.iteritems():
-            if animState == idx:
-                return state
+        return self._kEvalTSAnimNames[self._findProperty('EvaluateTSAnim').Data]
     
     def SetEvalTSAnimation(self, state):
         '''Set the eval ts animation'''
         try:
-            self.component.PropertyList.Find('EvaluateTSAnim').Data = self.kEvalTSAnim[state]
+            self._findProperty('EvaluateTSAnim').Data = self.kEvalTSAnim[state]
         except KeyError:
             raise Exception("Invalid evaluation state '%s'" % state)
     
@@ -700,11 +635,11 @@ class PMBPathConstraint(PMBConstraint):
     constraintType = 'Path'
     kWarpMode = dict(Percent = 0, Segment = 1)
     kAxes = {'X':0, '-X':1, 'Y':2, '-Y':3, 'Z':4, '-Z':5}
+    # reverse lookups of the above {index : name}
+    _kWarpModeNames = dict((i, m) for m, i in kWarpMode.iteritems())
+    _kAxesNames = dict((i, a) for a, i in kAxes.iteritems())
     
-    # Constrained reference
-    SetConstrainedObject = _RefFuncIndexWrapper(_SetSingleRef, 0, 'SetConstrainedObject')
-    GetConstrainedObject = _RefFuncIndexWrapper(_GetSingleRef, 0, 'GetConstrainedObject')
-    RemoveConstrainedObject = _RefFuncIndexWrapper(_RemoveSingleRef, 0, 'RemoveConstrainedObject')
+    _refBindings = (('ConstrainedObject', 0, 'single'),)
     
     # Source reference
     def SetPathSource(self, model):
@@ -712,7 +647,7 @@ class PMBPathConstraint(PMBConstraint):
         from pyfbsdk import FBModelPath3D
         if not isinstance(model, FBModelPath3D):
             raise Exception("Object must be of type FBModelPath3D. Got '%s' instead" % model.__class__.__name__)
-        self.RemovePathSource()
+        _RemoveSingleRef(self, 1)
         self.component.ReferenceAdd(1, model)
     
     GetSourceObject = _RefFuncIndexWrapper(_GetSingleRef, 2)
@@ -720,111 +655,88 @@ class PMBPathConstraint(PMBConstraint):
 
     def GetWarpMode(self):
         '''Get the warp mode'''
-        warp = self.component.PropertyList.Find('WarpMode').Data
-        for mode, idx in self.kWarpMode.iteritems():
-            if warp == idx:
-                return mode
+        return self._kWarpModeNames[self._findProperty('WarpMode').Data]
     
     def SetWarpMode(self, mode):
         '''Set the warp mode'''
         try:
-            self.component.PropertyList.Find('WarpMode').Data = self.kWarpMode[mode]
+            self._findProperty('WarpMode').Data = self.kWarpMode[mode]
         except KeyError:
             raise Exception("Invalid warp mode '%s'" % mode)
     
     def GetWarp(self):
         '''Get the warp value'''
-        return self.component.PropertyList.Find('Warp').Data
+        return self._findProperty('Warp').Data
     
     def SetWarp(self, value):
         '''Set the warp value'''
-        self.component.PropertyList.Find('Warp').Data = value
-    
-    @property
-    def FollowPath(self):
-        '''Set the state of follow path'''
-        return self.component.PropertyList.Find('FollowPath').Data
+        self._findProperty('Warp').Data = value
     
-    @FollowPath.setter
-    def FollowPath(self, state):
-        self.component.PropertyList.Find('FollowPath').Data = state
+    FollowPath = _PropertyAccessor('FollowPath', 'Set the state of follow path')
     
     def SetUpVectorAxis(self, axis):
         '''Set the up vector axis'''
         try:
-            self.component.PropertyList.Find('UpDirection').Data = self.kAxes[axis]
+            self._findProperty('UpDirection').Data = self.kAxes[axis]
         except KeyError:
             raise Exception("Invalid axis '%s'" % axis)
     
     def GetUpVectorAxis(self):
         '''Get the up vector axis'''
-        upAxis = self.component.PropertyList.Find('UpDirection').Data
-        for axis, idx in self.kAxes.iteritems():
-            if upAxis == idx:
-                return axis
+        return self._kAxesNames[self._findProperty('UpDirection').Data]
     
     def SetFrontVectorAxis(self, axis):
         '''Set the front vector axis'''
         try:
-            self.component.PropertyList.Find('FrontDirection').Data = self.kAxes[axis]
+            self._findProperty('FrontDirection').Data = self.kAxes[axis]
         except KeyError:
             raise Exception("Invalid axis '%s'" % axis)
     
     def GetFrontVectorAxis(self):
         '''Get the front vector axis'''
-        frontAxis = self.component.PropertyList.Find('UpDirection').Data
-        for axis, idx in self.kAxes.iteritems():
-            if frontAxis == idx:
-                return axis
+        return self._kAxesNames[self._findProperty('FrontDirection').Data]
     
     def SetTranslationOffset(self, vector):
         '''Set the translation offset'''
-        self.component.PropertyList.Find('Translation Offset').Data = vector
+        self._findProperty('Translation Offset').Data = vector
     
     def GetTranslationOffset(self):
         '''Get the translation offset'''
-        return self.component.PropertyList.Find('Translation Offset').Data
+        return self._findProperty('Translation Offset').Data
     
     def SetRoll(self, value):
         '''Set the roll value'''
-        self.component.PropertyList.Find('Roll').Data = value
+        self._findProperty('Roll').Data = value
     
     def GetRoll(self):
         '''Get the roll value'''
-        return self.component.PropertyList.Find('Roll').Data
+        return self._findProperty('Roll').Data
     
     def SetPitch(self, value):
         '''Set the pitch value'''
-        self.component.PropertyList.Find('Pitch').Data = value
+        self._findProperty('Pitch').Data = value
     
     def GetPitch(self):
         '''Get the pitch value'''
-        return self.component.PropertyList.Find('Pitch').Data
+        return self._findProperty('Pitch').Data
     
     def SetYaw(self, value):
         '''Set the yaw value'''
-        self.component.PropertyList.Find('Yaw').Data = value
+        self._findProperty('Yaw').Data = value
     
     def GetYaw(self):
         '''Get the yaw value'''
-        return self.component.PropertyList.Find('Yaw').Data
+        return self._findProperty('Yaw').Data
     
     def SetUIColor(self, color):
         '''Set the UI color'''
-        self.component.PropertyList.Find('UI Color').Data = color
+        self._findProperty('UI Color').Data = color
     
     def GetUIColor(self):
         '''Get the UI color'''
-        return self.component.PropertyList.Find('UI Color').Data
+        return self._findProperty('UI Color').Data
     
-    @property
-    def ShowWarpKeyFrame(self):
-        '''The state of the show warp key frame'''
-        return self.component.PropertyList.Find('ShowWarp').Data
-    
-    @ShowWarpKeyFrame.setter
-    def ShowWarpKeyFrame(self, state):
-        self.component.PropertyList.Find('ShowWarp').Data = state
+    ShowWarpKeyFrame = _PropertyAccessor('ShowWarp', 'The state of the show warp key frame')
 
 class PMBExpressionConstraint(PMBConstraint):
     '''Expression constraint class'''
@@ -834,15 +746,8 @@ class PMBMultiReferentialConstraint(PMBConstraint):
     '''Multi referential constraint class'''
     constraintType = 'Multi Referential'
     
-    # Rigid reference
-    AddRigidObject = _RefFuncIndexWrapper(_AddMultiRef, 0, 'AddRigidObject')
-    GetRigidObject = _RefFuncIndexWrapper(_GetMultiRef, 0, 'GetRigidObject')
-    RemoveRigidObject = _RefFuncIndexWrapper(_RemoveMultiRef, 0, 'RemoveRigidObject')
-    
-    # Rigid reference
-    AddParentObject = _RefFuncIndexWrapper(_AddMultiRef, 1, 'AddParentObject')
-    GetParentObject = _RefFuncIndexWrapper(_GetMultiRef, 1, 'GetParentObject')
-    RemoveParentObject = _RefFuncIndexWrapper(_RemoveMultiRef, 1, 'RemoveParentObject')
+    _refBindings = (('RigidObject', 0, 'multi'),
+                    ('ParentObject', 1, 'multi'))
     
 ########## TO DO ######################################################
     def SetActiveReference(self, model):
@@ -852,49 +757,63 @@ class PMBMultiReferentialConstraint(PMBConstraint):
         raise NotImplementedError('This method is not yet completed')
 #######################################################################
     
+    def _findOffsetProperty(self, model, suffix):
+        '''Returns the offset property of a model by name or model object'''
+        # the offset properties come and go with the references so they are not cached
+        return self._findProperty(getattr(model, 'Name', model) + suffix, False)
+    
     def SetOffsetTranslation(self, model, vector):
         '''Set the offset translation for the given model'''
-        if hasattr(model, 'Name'):
-            model = model.Name
-        propertyName = '%s.Offset.Translation' % model
-        self.component.PropertyList.Find(propertyName).Data = vector
+        self._findOffsetProperty(model, '.Offset.Translation').Data = vector
     
     def GetOffsetTranslation(self, model):
         '''Get the offset translation for the given model'''
-        if hasattr(model, 'Name'):
-            model = model.Name
-        propertyName = '%s.Offset.Translation' % model
-        return self.component.PropertyList.Find(propertyName).Data
+        return self._findOffsetProperty(model, '.Offset.Translation').Data
     
     def SetOffsetRotation(self, model, vector):
         '''Set the offset rotation for the given model'''
-        if hasattr(model, 'Name'):
-            model = model.Name
-        propertyName = '%s.Offset.Rotation' % model
-        self.component.PropertyList.Find(propertyName).Data = vector
+        self._findOffsetProperty(model, '.Offset.Rotation').Data = vector
     
     def GetOffsetRotation(self, model):
         '''Get the offset rotation for the given model'''
-        if hasattr(model, 'Name'):
-            model = model.Name
-        propertyName = '%s.Offset.Rotation' % model
-        return self.component.PropertyList.Find(propertyName).Data
+        return self._findOffsetProperty(model, '.Offset.Rotation').Data
         
 class PMBConstraintRelation(PMBConstraint):
     '''Relation constraint class'''
     constraintType = 'Relation'
     
+    def __init__(self, component):
+        super(PMBConstraintRelation, self).__init__(component)
+        # boxes by name {name : (relation box, true box)}
+        # rebuilt whenever a name is not found or is out of date
+        self._boxNames = {}
+    
     def GetBoxByName(self, name):
         '''
         Find a box with a specific name (Name at the top of function box).
         Uses component name if the box is an object in the scene otherwise
         it will use the box name
         '''
+        # a cached box is only used if it still has the same name
+        boxes = self._boxNames.get(name)
+        if boxes is not None:
+            try:
+                if boxes[1].LongName == name:
+                    return boxes[0]
+            except _UnboundWrapperError:
+                # the box was deleted since the names were indexed
+                pass
+        
+        self._boxNames.clear()
         for relBox in self.component.Boxes:
             # get the true box to get the name
             box = getattr(relBox, 'Box', relBox)
-            if box.LongName == name:
-                return relBox
+            # the first box with a name wins, same as searching in order
+            self._boxNames.setdefault(box.LongName, (relBox, box))
+        
+        boxes = self._boxNames.get(name)
+        if boxes is not None:
+            return boxes[0]
 
 # Assign the classes to the description of each constraint
 kConstraintClassDict = {"Aim" : PMBAimConstraint,
@@ -911,4 +830,7 @@ kConstraintClassDict = {"Aim" : PMBAimConstraint,
                         "Rigid Body" : PMBRigidBodyConstraint,
                         "Rotation From Rotations" : PMBRotationConstraint,
                         "Scale From Scales" : PMBScaleConstraint,
-                        "Character" : PMBCharacter}
\ No newline at end of file
+                        "Character" : PMBCharacter}
+
+# constraint type of each description {description : constraintType}
+_kConstraintDescriptionTypes = dict((desc, getattr(cls, 'constraintType', None)) for desc, cls in kConstraintClassDict.iteritems())
\ No newline at end of file
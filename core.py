@@ -18,11 +18,27 @@
 Module for more general functions
 '''
 import re
+import inspect
+import functools
 from pyfbsdk import FBSystem
 from pyfbsdk import FBProgress
+from pyfbsdk import FBCamera
+from pyfbsdk import FBLight
+from pyfbsdk import FBMaterial
+from pyfbsdk import FBTexture
+from pyfbsdk import FBShader
+from pyfbsdk import FBTake
 
-# get the whole list of components
-kAllSceneComponents = FBSystem().Scene.Components
+# types that have their own list in the scene {type : scene list name}
+_kSceneListTypes = {FBCamera : 'Cameras',
+                    FBLight : 'Lights',
+                    FBMaterial : 'Materials',
+                    FBTexture : 'Textures',
+                    FBShader : 'Shaders',
+                    FBTake : 'Takes'}
+
+# pyfbsdk class names to classes {name : class}, filled in on first use
+_kTypeNames = {}
 
 def deselect(pattern=None, **kwargs):
     '''
@@ -31,16 +47,9 @@ def deselect(pattern=None, **kwargs):
     '''
     kwargs['selected'] = True
     
-    if not hasattr(pattern, '__iter__'):
-        pattern = [pattern]
-    
-    for item in pattern:
-        matched = ls(pattern=item, **kwargs)
-        for obj in matched:
-            try:
-                obj.component.Selected = False
-            except:
-                obj.Selected = False
+    # all the patterns are matched in a single pass over the scene
+    for cmpnt in _iterComponents(pattern=pattern, **kwargs):
+        cmpnt.Selected = False
 
 def select(pattern=None, add=False, toggle=False, **kwargs):
     '''
@@ -49,123 +58,177 @@ def select(pattern=None, add=False, toggle=False, **kwargs):
     @param toggle: toggles the selection of the matched objects
     See ls function for additional arguments
     '''
-    if not hasattr(pattern, "__iter__"):
-        pattern = [pattern]
-    
     kwargs.pop('selected', None)
     
-    if not add and not toggle:
-        deselect(pattern=None, **kwargs)
-    
+    # all the patterns are matched in a single pass over the scene and
+    # each object is selected as soon as it is matched
     if toggle:
-        def selectFunc(x):
-            try:
-                x.component.Selected = not x.component.Selected
-            except:
-                x.Selected = not x.Selected
+        for cmpnt in _iterComponents(pattern=pattern, **kwargs):
+            cmpnt.Selected = not cmpnt.Selected
+    elif add:
+        for cmpnt in _iterComponents(pattern=pattern, **kwargs):
+            cmpnt.Selected = True
     else:
-        def selectFunc(x):
-            try:
-                x.component.Selected = True
-            except:
-                x.Selected = True
-                
-    for item in pattern:
-        matched = ls(pattern=item, **kwargs)
-        map(selectFunc, matched)
+        # the same pass collects the components that only failed the name
+        # test so the current selection is cleared without another scan
+        unmatched = []
+        for cmpnt in _iterComponents(pattern=pattern, _unmatched=unmatched, **kwargs):
+            cmpnt.Selected = True
+        for cmpnt in unmatched:
+            if cmpnt.Selected:
+                cmpnt.Selected = False
     
 def delete(pattern=None, **kwargs):
     '''
     Deletes objects that match the given parameters
     See ls function for additional arguments
     '''
-    if not hasattr(pattern, "__iter__"):
-        pattern = [pattern]
-    
-    for item in pattern:
-        matched = ls(pattern=item, **kwargs)
-        for obj in matched:
-            try:
-                obj.component.FBDelete()
-            except:
-                obj.FBDelete()
+    # the matches are collected first since deleting removes them from
+    # the scene list that is being searched
+    for cmpnt in list(_iterComponents(pattern=pattern, **kwargs)):
+        cmpnt.FBDelete()
 
-def ls(pattern=None, type=None, selected=None, visible=None, includeNamespace=True):
+def ls(pattern=None, type=None, selected=None, visible=None, includeNamespace=True, _components=None):
     '''
     Similar to Maya's ls command - returns list of objects that match the given parameters
-    @param pattern: name of an object with with optional wild cards '*'
+    @param pattern: name of an object with with optional wild cards '*' or a list of names
     @param type: object to compare if the component is of that type (either string or python class/type)
     @param selected: True/False if the object is selected or not. Default is either
     @param visible: True/False if the object is visible. Default is either 
     @param includeNamespace: does the search use the complete name (with namespace)  Default True
     '''
-    # set up the name testing based on the pattern
-    if pattern:
-        # create a name return function
-        if includeNamespace:
-            getName = lambda x: getattr(x, 'LongName', x.Name)
-        else:
-            getName = lambda x: x.Name
+    return list(lsIter(pattern, type, selected, visible, includeNamespace, _components))
+
+def lsIter(pattern=None, type=None, selected=None, visible=None, includeNamespace=True, _components=None):
+    '''
+    Generator version of ls - yields the objects that match the given parameters
+    one at a time instead of building a list
+    See ls function for available arguments
+    '''
+    for cmpnt in _iterComponents(pattern, type, selected, visible, includeNamespace, _components):
+        # try converting it to a pymobu object
+        try:
+            pmbCmpnt = cmpnt.ConvertToPyMoBu()
+        except:
+            pmbCmpnt = cmpnt
         
-        # if there is a wild card in the pattern
-        if '*' in pattern:
-            pattern = pattern.replace('*', '.*')
-            # name testing function
-            nameMatch = re.compile(pattern)
-            passesNameTest = lambda x: nameMatch.match(getName(x))
-        else:
-            passesNameTest = lambda x: pattern == getName(x)       
-    else:
-        passesNameTest = lambda x: True
+        yield pmbCmpnt
 
-    # for getting selection test
-    if selected is not None:
-        passesSelectionTest = lambda x: x.Selected == selected
-    else:
-        passesSelectionTest = lambda x: True
-    
-    # for getting visibility test
-    if visible is not None:
-        passesVisibilityTest = lambda x: visible == bool(getattr(x, 'Visibility', False))
-    else:
-        passesVisibilityTest = lambda x: True
+def _iterComponents(pattern=None, type=None, selected=None, visible=None, includeNamespace=True, _components=None, _unmatched=None):
+    '''
+    Yields the scene components that match the ls parameters without
+    converting them to PyMoBu objects
+    @param _unmatched: optional list to collect components that passed every test but the name
+    '''
+    # resolve the name test once so the loop only has to compare strings
+    nameTest = _getNameTest(pattern)
     
     # for testing the type of component
     if type:
-        # if they gave a string, evaluate it
+        # if they gave a string, look up the class
         if isinstance(type, basestring):
-            try:
-                type = eval(type)
-            except NameError:
-                raise NameError("Can not find object type '%s' in current namespace" % type)
-
-        passesTypeTest = lambda x: isinstance(x, type)
-    # no type was given so its True by default
-    else:
-        passesTypeTest = lambda x: True
+            type = _getTypeByName(type)
                
-    matchList = []
-    for cmpnt in kAllSceneComponents:
+    # get the component list when it is asked for so it is never stale
+    if _components is None:
+        # a type with its own scene list only needs that much shorter list
+        # searched and every item in it already passes the type test
+        sceneList = _kSceneListTypes.get(type)
+        if sceneList:
+            _components = getattr(FBSystem().Scene, sceneList)
+            type = None
+        else:
+            _components = FBSystem().Scene.Components
+    
+    # with nothing to test every component matches
+    if selected is None and visible is None and not type and not nameTest:
+        for cmpnt in _components:
+            yield cmpnt
+        return
+    
+    # bind the builtins and methods used in the loop to local names
+    _isinstance = isinstance
+    _getattr = getattr
+    _bool = bool
+    
+    # all the tests are done inline in a single loop rather than calling
+    # a predicate function per test for every component in the scene
+    for cmpnt in _components:
         # if we did not pass the selection test, continue on
-        if not passesSelectionTest(cmpnt):
+        if selected is not None and cmpnt.Selected != selected:
             continue
         # check if the object is visible
-        if not passesVisibilityTest(cmpnt):
+        if visible is not None and visible != _bool(_getattr(cmpnt, 'Visibility', False)):
             continue
         # do the same for matching type
-        if not passesTypeTest(cmpnt):
+        if type and not _isinstance(cmpnt, type):
             continue
         
-        if passesNameTest(cmpnt):
-            # try converting it to a pymobu object
-            try:
-                pmbCmpnt = cmpnt.ConvertToPyMoBu()
-            except:
-                pmbCmpnt = cmpnt
-                
-            matchList.append(pmbCmpnt)
-                   
-    return matchList
+        if nameTest:
+            if includeNamespace:
+                name = _getattr(cmpnt, 'LongName', cmpnt.Name)
+            else:
+                name = cmpnt.Name
+            if not nameTest(name):
+                if _unmatched is not None:
+                    _unmatched.append(cmpnt)
+                continue
+        
+        yield cmpnt
+
+def _getNameTest(pattern):
+    '''
+    Returns a function that tests a name against the pattern, or a list of
+    patterns, or None if every name matches
+    '''
+    if pattern is None or isinstance(pattern, basestring):
+        pattern = [pattern]
+    elif not isinstance(pattern, list):
+        pattern = list(pattern)
+    
+    # an empty pattern matches everything
+    if not all(pattern):
+        return None
+    
+    # simple single patterns use string methods rather than an expression
+    if len(pattern) == 1:
+        name = pattern[0]
+        if '*' not in name:
+            return name.__eq__
+        
+        literal = name.strip('*')
+        if '*' not in literal:
+            if not literal:
+                return None
+            elif name[0] != '*':
+                return lambda x: x.startswith(literal)
+            elif name[-1] != '*':
+                return lambda x: x.endswith(literal)
+            else:
+                return lambda x: literal in x
+    
+    # combine all the patterns so they are tested with one expression
+    # only the wild cards are special, everything else is matched literally
+    # the same as the single pattern tests above
+    expressions = []
+    for item in pattern:
+        expressions.append('.*'.join([re.escape(s) for s in item.split('*')]))
+    
+    # compile once and anchor so the whole name has to match
+    return re.compile('(?:%s)$' % '|'.join(expressions)).match
+
+def _getTypeByName(name):
+    '''Returns the pyfbsdk class with the given name'''
+    if not _kTypeNames:
+        import pyfbsdk
+        for attr in dir(pyfbsdk):
+            obj = getattr(pyfbsdk, attr)
+            if isinstance(obj, type):
+                _kTypeNames[attr] = obj
+    try:
+        return _kTypeNames[name]
+    except KeyError:
+        raise NameError("Can not find object type '%s' in current namespace" % name)
 
 def progressBarIterator(func, items):
     '''Function that displays a progress while looping a list of items through the function'''
@@ -194,30 +257,30 @@ def decorated(origFunc, newFunc, decoration=None):
     Most importantly, it adds the original function signature to the docstring of the decorating function,
     as well as a comment that the function was decorated. Supports nested decorations.
     """
-    if not hasattr(origFunc, '_decorated'):
+    if not getattr(origFunc, '_decorated', False):
         # a func that has yet to be treated - add the original argspec to the docstring
-        import inspect
         newFunc.__doc__ = "Original Arguments: %s\n\n%s" % (
             inspect.formatargspec(*inspect.getargspec(origFunc)), 
             inspect.getdoc(origFunc) or "")
     else:
         newFunc.__doc__ = origFunc.__doc__ or ""
     newFunc.__doc__ += "\n(Decorated by %s)" % (decoration or "%s.%s" % (newFunc.__module__, newFunc.__name__))
-    newFunc.__name__ = origFunc.__name__
-    newFunc.__module__ = origFunc.__module__
-    newFunc.__dict__ = origFunc.__dict__    # share attributes
+    # copies the attributes rather than sharing the same dictionary
+    functools.update_wrapper(newFunc, origFunc, ('__module__', '__name__'))
     newFunc._decorated = True   # stamp the function as decorated
 
 def decorator(func):
     """
     Decorator for decorators. Calls the 'decorated' function above for the decorated function, to preserve docstrings.
     """
+    # the decoration name never changes so only build it once
+    decoration = "%s.%s" % (func.__module__, func.__name__)
+    @functools.wraps(func)
     def decoratorFunc(origFunc, *x):
         args = (origFunc,) + x
         if x:
             origFunc = x[0]
         newFunc = func(*args)
-        decorated(origFunc, newFunc, "%s.%s" % (func.__module__, func.__name__))
+        decorated(origFunc, newFunc, decoration)
         return newFunc
-    decorated(func,decoratorFunc, "%s.%s" % (__name__, "decorator"))
     return decoratorFunc
\ No newline at end of file
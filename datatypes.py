@@ -27,136 +27,367 @@ Works with FBMatrix, FBVector3d, and FBVector2d
 To use, import this module and call insertMathClasses function to integrate
 insert these as base classes.
 '''
+from __future__ import division
 import math
-import operator
 from pyfbsdk import FBVector3d
 from pyfbsdk import FBVector2d
 from pyfbsdk import FBMatrix
 
+# module level names for the math functions so they are not looked up
+# on the math module every time a matrix or vector is built
+_sin = math.sin
+_cos = math.cos
+_sqrt = math.sqrt
+_acos = math.acos
+_tan = math.tan
+
+# number types vectors can be multiplied and divided by
+try:
+    _kNumericTypes = (int, long, float)
+except NameError:
+    _kNumericTypes = (int, float)
+
+# -----------------------------------------------------
+# Matrix kernels
+# -----------------------------------------------------
+# Work on flat row major sequences of 16 floats so the
+# matrix is read once instead of an element at a time
+# -----------------------------------------------------
+def _values16(M):
+    '''
+    Returns the 16 values of a matrix as a list, read in one pass
+    @param M: FBMatrix
+    '''
+    # iterates the matrix's indexed sequence protocol in C
+    return list(M)
+
+def _multiply16(A, B):
+    '''
+    Returns the product of two row major 4x4 matrices as a tuple of 16 floats
+    @param A: sequence of 16 floats
+    @param B: sequence of 16 floats
+    '''
+    (Aa, Ab, Ac, Ad,
+     Ae, Af, Ag, Ah,
+     Ai, Aj, Ak, Al,
+     Am, An, Ao, Ap) = A
+    (Ba, Bb, Bc, Bd,
+     Be, Bf, Bg, Bh,
+     Bi, Bj, Bk, Bl,
+     Bm, Bn, Bo, Bp) = B
+    return (Aa * Ba + Ab * Be + Ac * Bi + Ad * Bm,
+            Aa * Bb + Ab * Bf + Ac * Bj + Ad * Bn,
+            Aa * Bc + Ab * Bg + Ac * Bk + Ad * Bo,
+            Aa * Bd + Ab * Bh + Ac * Bl + Ad * Bp,
+            Ae * Ba + Af * Be + Ag * Bi + Ah * Bm,
+            Ae * Bb + Af * Bf + Ag * Bj + Ah * Bn,
+            Ae * Bc + Af * Bg + Ag * Bk + Ah * Bo,
+            Ae * Bd + Af * Bh + Ag * Bl + Ah * Bp,
+            Ai * Ba + Aj * Be + Ak * Bi + Al * Bm,
+            Ai * Bb + Aj * Bf + Ak * Bj + Al * Bn,
+            Ai * Bc + Aj * Bg + Ak * Bk + Al * Bo,
+            Ai * Bd + Aj * Bh + Ak * Bl + Al * Bp,
+            Am * Ba + An * Be + Ao * Bi + Ap * Bm,
+            Am * Bb + An * Bf + Ao * Bj + Ap * Bn,
+            Am * Bc + An * Bg + Ao * Bk + Ap * Bo,
+            Am * Bd + An * Bh + Ao * Bl + Ap * Bp)
+
+def _determinant16(m):
+    '''
+    Returns the determinant of a row major 4x4 matrix
+    @param m: sequence of 16 floats
+    '''
+    return ((m[0] * m[5] - m[4] * m[1])
+          * (m[10] * m[15] - m[14] * m[11])
+          - (m[0] * m[9] - m[8] * m[1])
+          * (m[6] * m[15] - m[14] * m[7])
+          + (m[0] * m[13] - m[12] * m[1])
+          * (m[6] * m[11] - m[10] * m[7])
+          + (m[4] * m[9] - m[8] * m[5])
+          * (m[2] * m[15] - m[14] * m[3])
+          - (m[4] * m[13] - m[12] * m[5])
+          * (m[2] * m[11] - m[10] * m[3])
+          + (m[8] * m[13] - m[12] * m[9])
+          * (m[2] * m[7] - m[6] * m[3]))
+
+def _inverse16(m):
+    '''
+    Returns the inverse of a row major 4x4 matrix as a tuple of 16 floats
+    or None if the matrix can not be inverted
+    @param m: sequence of 16 floats
+    '''
+    (a00, a01, a02, a03,
+     a10, a11, a12, a13,
+     a20, a21, a22, a23,
+     a30, a31, a32, a33) = m
+    
+    # the 2x2 minors of the top and bottom two rows are shared by the
+    # determinant and all of the cofactors so they are only worked out once
+    s0 = a00 * a11 - a10 * a01
+    s1 = a00 * a12 - a10 * a02
+    s2 = a00 * a13 - a10 * a03
+    s3 = a01 * a12 - a11 * a02
+    s4 = a01 * a13 - a11 * a03
+    s5 = a02 * a13 - a12 * a03
+    c0 = a20 * a31 - a30 * a21
+    c1 = a20 * a32 - a30 * a22
+    c2 = a20 * a33 - a30 * a23
+    c3 = a21 * a32 - a31 * a22
+    c4 = a21 * a33 - a31 * a23
+    c5 = a22 * a33 - a32 * a23
+    
+    d = s0 * c5 - s1 * c4 + s2 * c3 + s3 * c2 - s4 * c1 + s5 * c0
+    if abs(d) < 0.001:
+        return None
+    
+    d = 1.0 / d
+    return ((a11 * c5 - a12 * c4 + a13 * c3) * d,
+            (a02 * c4 - a01 * c5 - a03 * c3) * d,
+            (a31 * s5 - a32 * s4 + a33 * s3) * d,
+            (a22 * s4 - a21 * s5 - a23 * s3) * d,
+            (a12 * c2 - a10 * c5 - a13 * c1) * d,
+            (a00 * c5 - a02 * c2 + a03 * c1) * d,
+            (a32 * s2 - a30 * s5 - a33 * s1) * d,
+            (a20 * s5 - a22 * s2 + a23 * s1) * d,
+            (a10 * c4 - a11 * c2 + a13 * c0) * d,
+            (a01 * c2 - a00 * c4 - a03 * c0) * d,
+            (a30 * s4 - a31 * s2 + a33 * s0) * d,
+            (a21 * s2 - a20 * s4 - a23 * s0) * d,
+            (a11 * c1 - a10 * c3 - a12 * c0) * d,
+            (a00 * c3 - a01 * c1 + a02 * c0) * d,
+            (a31 * s1 - a30 * s3 - a32 * s0) * d,
+            (a20 * s3 - a21 * s1 + a22 * s0) * d)
+
+def _rotate16(A, R):
+    '''
+    Returns a row major 4x4 matrix multiplied by a rotation as a tuple of 16 floats.
+    Only the upper 3x3 of the rotation can be set so the fourth row and column
+    of the product are left out of the multiply.
+    @param A: sequence of 16 floats
+    @param R: sequence of the 9 floats of the row major 3x3 rotation
+    '''
+    (Aa, Ab, Ac, Ad,
+     Ae, Af, Ag, Ah,
+     Ai, Aj, Ak, Al,
+     Am, An, Ao, Ap) = A
+    (Ra, Rb, Rc,
+     Rd, Re, Rf,
+     Rg, Rh, Ri) = R
+    return (Aa * Ra + Ab * Rd + Ac * Rg, Aa * Rb + Ab * Re + Ac * Rh, Aa * Rc + Ab * Rf + Ac * Ri, Ad,
+            Ae * Ra + Af * Rd + Ag * Rg, Ae * Rb + Af * Re + Ag * Rh, Ae * Rc + Af * Rf + Ag * Ri, Ah,
+            Ai * Ra + Aj * Rd + Ak * Rg, Ai * Rb + Aj * Re + Ak * Rh, Ai * Rc + Aj * Rf + Ak * Ri, Al,
+            Am * Ra + An * Rd + Ao * Rg, Am * Rb + An * Re + Ao * Rh, Am * Rc + An * Rf + Ao * Ri, Ap)
+
+def _rotateAxis9(angle, axis):
+    '''Returns the 3x3 rotation around an axis as a row major tuple of 9 floats'''
+    # normalize the axis on locals rather than building a new vector
+    x = axis[0]
+    y = axis[1]
+    z = axis[2]
+    d = _sqrt(x * x + y * y + z * z)
+    if d:
+        d = 1.0 / d
+        x *= d
+        y *= d
+        z *= d
+
+    s = _sin(angle)
+    c = _cos(angle)
+    c1 = 1. - c
+    
+    # from the glRotate man page
+    return (x * x * c1 + c, x * y * c1 - z * s, x * z * c1 + y * s,
+            y * x * c1 + z * s, y * y * c1 + c, y * z * c1 - x * s,
+            x * z * c1 - y * s, y * z * c1 + x * s, z * z * c1 + c)
+
+def _rotateEuler9(heading, attitude, bank):
+    '''Returns the 3x3 euler rotation as a row major tuple of 9 floats'''
+    # from http://www.euclideanspace.com/
+    ch = _cos(heading)
+    sh = _sin(heading)
+    ca = _cos(attitude)
+    sa = _sin(attitude)
+    cb = _cos(bank)
+    sb = _sin(bank)
+
+    return (ch * ca, sh * sb - ch * sa * cb, ch * sa * sb + sh * cb,
+            sa, ca * cb, -ca * sb,
+            -sh * ca, sh * sa * cb + ch * sb, -sh * sa * sb + ch * cb)
+
+def _rotateTripleAxis9(x, y, z):
+    '''Returns the 3x3 rotation with the three axes as its columns as a row major tuple of 9 floats'''
+    return (x[0], y[0], z[0],
+            x[1], y[1], z[1],
+            x[2], y[2], z[2])
+
+def _scale16(m, x, y, z):
+    '''Returns a row major 4x4 matrix scaled, as if multiplied by the matching New matrix'''
+    return (m[0] * x, m[1] * y, m[2] * z, m[3],
+            m[4] * x, m[5] * y, m[6] * z, m[7],
+            m[8] * x, m[9] * y, m[10] * z, m[11],
+            m[12] * x, m[13] * y, m[14] * z, m[15])
+
+def _translate16(m, x, y, z):
+    '''Returns a row major 4x4 matrix translated, as if multiplied by the matching New matrix'''
+    return (m[0], m[1], m[2], m[0] * x + m[1] * y + m[2] * z + m[3],
+            m[4], m[5], m[6], m[4] * x + m[5] * y + m[6] * z + m[7],
+            m[8], m[9], m[10], m[8] * x + m[9] * y + m[10] * z + m[11],
+            m[12], m[13], m[14], m[12] * x + m[13] * y + m[14] * z + m[15])
+
+def _rotateX16(m, angle):
+    '''Returns a row major 4x4 matrix rotated around X, as if multiplied by the matching New matrix'''
+    s = _sin(angle)
+    c = _cos(angle)
+    return (m[0], m[1] * c + m[2] * s, m[2] * c - m[1] * s, m[3],
+            m[4], m[5] * c + m[6] * s, m[6] * c - m[5] * s, m[7],
+            m[8], m[9] * c + m[10] * s, m[10] * c - m[9] * s, m[11],
+            m[12], m[13] * c + m[14] * s, m[14] * c - m[13] * s, m[15])
+
+def _rotateY16(m, angle):
+    '''Returns a row major 4x4 matrix rotated around Y, as if multiplied by the matching New matrix'''
+    s = _sin(angle)
+    c = _cos(angle)
+    return (m[0] * c - m[2] * s, m[1], m[0] * s + m[2] * c, m[3],
+            m[4] * c - m[6] * s, m[5], m[4] * s + m[6] * c, m[7],
+            m[8] * c - m[10] * s, m[9], m[8] * s + m[10] * c, m[11],
+            m[12] * c - m[14] * s, m[13], m[12] * s + m[14] * c, m[15])
+
+def _rotateZ16(m, angle):
+    '''Returns a row major 4x4 matrix rotated around Z, as if multiplied by the matching New matrix'''
+    s = _sin(angle)
+    c = _cos(angle)
+    return (m[0] * c + m[1] * s, m[1] * c - m[0] * s, m[2], m[3],
+            m[4] * c + m[5] * s, m[5] * c - m[4] * s, m[6], m[7],
+            m[8] * c + m[9] * s, m[9] * c - m[8] * s, m[10], m[11],
+            m[12] * c + m[13] * s, m[13] * c - m[12] * s, m[14], m[15])
+
+def _rotateAxis16(m, angle, axis):
+    '''Returns a row major 4x4 matrix rotated around an axis'''
+    return _rotate16(m, _rotateAxis9(angle, axis))
+
+def _rotateEuler16(m, heading, attitude, bank):
+    '''Returns a row major 4x4 matrix rotated by euler angles'''
+    return _rotate16(m, _rotateEuler9(heading, attitude, bank))
+
+def _transform16(A, x, y, z):
+    '''
+    Returns the point (x, y, z) transformed by a row major 4x4 matrix
+    as an (x, y, z) tuple
+    @param A: sequence of 16 floats
+    '''
+    X = A[0] * x + A[1] * y + A[2] * z + A[3]
+    Y = A[4] * x + A[5] * y + A[6] * z + A[7]
+    Z = A[8] * x + A[9] * y + A[10] * z + A[11]
+    w = A[12] * x + A[13] * y + A[14] * z + A[15]
+    if w != 0:
+        # one divide and three multiplies instead of three divides
+        w = 1.0 / w
+        X *= w
+        Y *= w
+        Z *= w
+    return X, Y, Z
+
 class PMBMatrix(object):
     '''Base class for FBMatrix'''      
     
+    # all of the data lives in the MotionBuilder object
+    __slots__ = ()
+    
     def __copy__(self):
         return self.__class__(self)
 
     Copy = __copy__
 
     def __mul__(self, other):
-        if isinstance(other, FBMatrix):
-            Aa = self[0]
-            Ab = self[1]
-            Ac = self[2]
-            Ad = self[3]
-            Ae = self[4]
-            Af = self[5]
-            Ag = self[6]
-            Ah = self[7]
-            Ai = self[8]
-            Aj = self[9]
-            Ak = self[10]
-            Al = self[11]
-            Am = self[12]
-            An = self[13]
-            Ao = self[14]
-            Ap = self[15]
-            Ba = other[0]
-            Bb = other[1]
-            Bc = other[2]
-            Bd = other[3]
-            Be = other[4]
-            Bf = other[5]
-            Bg = other[6]
-            Bh = other[7]
-            Bi = other[8]
-            Bj = other[9]
-            Bk = other[10]
-            Bl = other[11]
-            Bm = other[12]
-            Bn = other[13]
-            Bo = other[14]
-            Bp = other[15]
+        # an exact type compare is cheap and covers almost every call, the
+        # isinstance checks are only reached for subclasses
+        otherType = type(other)
+        if otherType is FBMatrix or isinstance(other, FBMatrix):
+            # read each matrix once and write the product back with a
+            # single slice assignment instead of 16 separate writes
             C = self.__class__()
-            C[0] = Aa * Ba + Ab * Be + Ac * Bi + Ad * Bm
-            C[1] = Aa * Bb + Ab * Bf + Ac * Bj + Ad * Bn
-            C[2] = Aa * Bc + Ab * Bg + Ac * Bk + Ad * Bo
-            C[3] = Aa * Bd + Ab * Bh + Ac * Bl + Ad * Bp
-            C[4] = Ae * Ba + Af * Be + Ag * Bi + Ah * Bm
-            C[5] = Ae * Bb + Af * Bf + Ag * Bj + Ah * Bn
-            C[6] = Ae * Bc + Af * Bg + Ag * Bk + Ah * Bo
-            C[7] = Ae * Bd + Af * Bh + Ag * Bl + Ah * Bp
-            C[8] = Ai * Ba + Aj * Be + Ak * Bi + Al * Bm
-            C[9] = Ai * Bb + Aj * Bf + Ak * Bj + Al * Bn
-            C[10] = Ai * Bc + Aj * Bg + Ak * Bk + Al * Bo
-            C[11] = Ai * Bd + Aj * Bh + Ak * Bl + Al * Bp
-            C[12] = Am * Ba + An * Be + Ao * Bi + Ap * Bm
-            C[13] = Am * Bb + An * Bf + Ao * Bj + Ap * Bn
-            C[14] = Am * Bc + An * Bg + Ao * Bk + Ap * Bo
-            C[15] = Am * Bd + An * Bh + Ao * Bl + Ap * Bp
+            C[:] = _multiply16(_values16(self), _values16(other))
             return C
-        elif isinstance(other, FBVector3d):
-            A = self
-            B = other
-            V = FBVector3d()
-            V.X = A[0] * B.X + A[1] * B.Y + A[2] * B.Z
-            V.Y = A[4] * B.X + A[5] * B.Y + A[6] * B.Z
-            V.z = A[8] * B.X + A[9] * B.Y + A[10] * B.Z
-            return V
+        elif otherType is FBVector3d or isinstance(other, FBVector3d):
+            # read the matrix and vector once and build the result in one call
+            A = _values16(self)
+            x = other[0]
+            y = other[1]
+            z = other[2]
+            return FBVector3d(A[0] * x + A[1] * y + A[2] * z,
+                              A[4] * x + A[5] * y + A[6] * z,
+                              A[8] * x + A[9] * y + A[10] * z)
+        return NotImplemented
 
     def Transform(self, other):
-        A = self
-        B = other
-        P = FBVector3d()
-        P.X = A[0] * B.X + A[1] * B.Y + A[2] * B.Z + A[3]
-        P.Y = A[4] * B.X + A[5] * B.Y + A[6] * B.Z + A[7]
-        P.Z = A[8] * B.X + A[9] * B.Y + A[10] * B.Z + A[11]
-        w =   A[12] * B.X + A[13] * B.Y + A[14] * B.Z + A[15]
-        if w <> 0:
-            P.X /= w
-            P.Y /= w
-            P.Z /= w
-        return P
+        # build the point from the transformed values in one call rather
+        # than creating it empty and setting each component
+        return FBVector3d(*_transform16(_values16(self), other[0], other[1], other[2]))
+
+    def TransformMany(self, points):
+        '''
+        Transforms a list of points by the matrix. Faster than calling
+        Transform in a loop since the matrix is only read once.
+        @param points: list of FBVector3d or (x, y, z) sequences
+        '''
+        m = _values16(self)
+        return [FBVector3d(*_transform16(m, p[0], p[1], p[2])) for p in points]
+
+    # the transform methods update the matrix in place as if it was
+    # multiplied by the matching New matrix, only touching the elements
+    # that change instead of doing a full matrix multiply
+    # a rotation by a zero angle leaves the matrix as it is
 
     def Scale(self, x, y, z):
-        self *= self.__class__.NewScale(x, y, z)
+        self[:] = _scale16(_values16(self), x, y, z)
         return self
 
     def Translate(self, x, y, z):
-        self *= self.__class__.NewTranslate(x, y, z)
-        return self 
+        self[:] = _translate16(_values16(self), x, y, z)
+        return self
 
     def RotateX(self, angle):
-        self *= self.__class__.NewRotateX(angle)
+        if not angle:
+            return self
+        self[:] = _rotateX16(_values16(self), angle)
         return self
 
     def RotateY(self, angle):
-        self *= self.__class__.NewRotateY(angle)
+        if not angle:
+            return self
+        self[:] = _rotateY16(_values16(self), angle)
         return self
 
     def RotateZ(self, angle):
-        self *= self.__class__.NewRotateZ(angle)
+        if not angle:
+            return self
+        self[:] = _rotateZ16(_values16(self), angle)
         return self
 
     def RotateAxis(self, angle, axis):
-        self *= self.__class__.NewRotateAxis(angle, axis)
+        if not angle:
+            return self
+        assert(isinstance(axis, FBVector3d))
+        self[:] = _rotateAxis16(_values16(self), angle, axis)
         return self
 
     def RotateEuler(self, heading, attitude, bank):
-        self *= self.__class__.NewRotateEuler(heading, attitude, bank)
+        if not (heading or attitude or bank):
+            return self
+        self[:] = _rotateEuler16(_values16(self), heading, attitude, bank)
         return self
 
     def RotateTriple_axis(self, x, y, z):
-        self *= self.__class__.NewRotateTripleAxis(x, y, z)
+        self[:] = _rotate16(_values16(self), _rotateTripleAxis9(x, y, z))
         return self
 
     def Transpose(self):
-        (self[0], self[4], self[8], self[12],
-         self[1], self[5], self[9], self[13],
-         self[2], self[6], self[10], self[14],
-         self[3], self[7], self[11], self[15]) = \
-        (self[0], self[1], self[2], self[3],
-         self[4], self[5], self[6], self[7],
-         self[8], self[9], self[10], self[11],
-         self[12], self[13], self[14], self[15])
+        # read the matrix once and write the columns back as rows
+        m = _values16(self)
+        self[:] = (m[0], m[4], m[8], m[12],
+                   m[1], m[5], m[9], m[13],
+                   m[2], m[6], m[10], m[14],
+                   m[3], m[7], m[11], m[15])
 
     def Transposed(self):
         M = self.Copy()
@@ -168,114 +399,96 @@ class PMBMatrix(object):
         M = cls()
         M[:] = values
         return M
+
+    @classmethod
+    def Builder(cls):
+        '''Returns a PMBMatrixBuilder for chaining transforms into a new matrix'''
+        return PMBMatrixBuilder(cls)
+    
+    # the New constructors build all 16 values and write them in one go
+    # with New rather than changing elements of an identity one at a time
+    # a zero angle rotation is just a new identity matrix
     
     @classmethod
     def NewIdentity(cls):
+        # a new matrix already starts out as the identity
         self = cls()
         return self
 
     @classmethod
     def NewScale(cls, x, y, z):
-        self = cls()
-        self[0] = x
-        self[5] = y
-        self[10] = z
-        return self
+        return cls.New(x, 0, 0, 0,
+                       0, y, 0, 0,
+                       0, 0, z, 0,
+                       0, 0, 0, 1)
     
     @classmethod
     def NewTranslate(cls, x, y, z):
-        self = cls()
-        self[3] = x
-        self[7] = y
-        self[11] = z
-        return self
+        return cls.New(1, 0, 0, x,
+                       0, 1, 0, y,
+                       0, 0, 1, z,
+                       0, 0, 0, 1)
     
     @classmethod
     def NewRotateX(cls, angle):
-        self = cls()
-        s = math.sin(angle)
-        c = math.cos(angle)
-        self[5] = self[10] = c
-        self[6] = -s
-        self[9] = s
-        return self
+        if not angle:
+            return cls()
+        s = _sin(angle)
+        c = _cos(angle)
+        return cls.New(1, 0, 0, 0,
+                       0, c, -s, 0,
+                       0, s, c, 0,
+                       0, 0, 0, 1)
     
     @classmethod
     def NewRotateY(cls, angle):
-        self = cls()
-        s = math.sin(angle)
-        c = math.cos(angle)
-        self[0] = self[10] = c
-        self[2] = s
-        self[8] = -s
-        return self    
+        if not angle:
+            return cls()
+        s = _sin(angle)
+        c = _cos(angle)
+        return cls.New(c, 0, s, 0,
+                       0, 1, 0, 0,
+                       -s, 0, c, 0,
+                       0, 0, 0, 1)
     
     @classmethod
     def NewRotateZ(cls, angle):
-        self = cls()
-        s = math.sin(angle)
-        c = math.cos(angle)
-        self[0] = self[5] = c
-        self[1] = -s
-        self[4] = s
-        return self
+        if not angle:
+            return cls()
+        s = _sin(angle)
+        c = _cos(angle)
+        return cls.New(c, -s, 0, 0,
+                       s, c, 0, 0,
+                       0, 0, 1, 0,
+                       0, 0, 0, 1)
     
     @classmethod
     def NewRotateAxis(cls, angle, axis):
         assert(isinstance(axis, FBVector3d))
-        vector = axis.Normalized()
-        x = vector.X
-        y = vector.Y
-        z = vector.Z
-
-        self = cls()
-        s = math.sin(angle)
-        c = math.cos(angle)
-        c1 = 1. - c
-        
-        # from the glRotate man page
-        self[0] = x * x * c1 + c
-        self[1] = x * y * c1 - z * s
-        self[2] = x * z * c1 + y * s
-        self[4] = y * x * c1 + z * s
-        self[5] = y * y * c1 + c
-        self[6] = y * z * c1 - x * s
-        self[8] = x * z * c1 - y * s
-        self[9] = y * z * c1 + x * s
-        self[10] = z * z * c1 + c
-        return self
+        if not angle:
+            return cls()
+        Ra, Rb, Rc, Rd, Re, Rf, Rg, Rh, Ri = _rotateAxis9(angle, axis)
+        return cls.New(Ra, Rb, Rc, 0,
+                       Rd, Re, Rf, 0,
+                       Rg, Rh, Ri, 0,
+                       0, 0, 0, 1)
 
     @classmethod
     def NewRotateEuler(cls, heading, attitude, bank):
-        # from http://www.euclideanspace.com/
-        ch = math.cos(heading)
-        sh = math.sin(heading)
-        ca = math.cos(attitude)
-        sa = math.sin(attitude)
-        cb = math.cos(bank)
-        sb = math.sin(bank)
-
-        self = cls()
-        self[0] = ch * ca
-        self[1] = sh * sb - ch * sa * cb
-        self[2] = ch * sa * sb + sh * cb
-        self[4] = sa
-        self[5] = ca * cb
-        self[6] = -ca * sb
-        self[8] = -sh * ca
-        self[9] = sh * sa * cb + ch * sb
-        self[10] = -sh * sa * sb + ch * cb
-        return self
+        if not (heading or attitude or bank):
+            return cls()
+        Ra, Rb, Rc, Rd, Re, Rf, Rg, Rh, Ri = _rotateEuler9(heading, attitude, bank)
+        return cls.New(Ra, Rb, Rc, 0,
+                       Rd, Re, Rf, 0,
+                       Rg, Rh, Ri, 0,
+                       0, 0, 0, 1)
     
     @classmethod
     def NewRotateTripleAxis(cls, x, y, z):
-      m = cls()
-      
-      m[0], m[1], m[2] = x.X, y.X, z.X
-      m[4], m[5], m[6] = x.Y, y.Y, z.Y
-      m[8], m[9], m[10] = x.Z, y.Z, z.Z
-      
-      return m
+      return cls.New(x.X, y.X, z.X, 0,
+                     x.Y, y.Y, z.Y, 0,
+                     x.Z, y.Z, z.Z, 0,
+                     0, 0, 0, 1)
   
     @classmethod
     def NewLookAt(cls, eye, at, up):
@@ -290,78 +503,110 @@ class PMBMatrix(object):
     @classmethod
     def NewPerspective(cls, fov_y, aspect, near, far):
         # from the gluPerspective man page
-        f = 1 / math.tan(fov_y / 2)
-        self = cls()
+        f = 1 / _tan(fov_y / 2)
         assert near != 0.0 and near != far
-        self[0] = f / aspect
-        self[5] = f
-        self[10] = (far + near) / (near - far)
-        self[11] = 2 * far * near / (near - far)
-        self[14] = -1
-        self[15] = 0
-        return self
+        return cls.New(f / aspect, 0, 0, 0,
+                       0, f, 0, 0,
+                       0, 0, (far + near) / (near - far), 2 * far * near / (near - far),
+                       0, 0, -1, 0)
 
     def Determinant(self):
-        return ((self[0] * self[5] - self[4] * self[1])
-              * (self[10] * self[15] - self[14] * self[11])
-              - (self[0] * self[9] - self[8] * self[1])
-              * (self[6] * self[15] - self[14] * self[7])
-              + (self[0] * self[13] - self[12] * self[1])
-              * (self[6] * self[11] - self[10] * self[7])
-              + (self[4] * self[9] - self[8] * self[5])
-              * (self[2] * self[15] - self[14] * self[3])
-              - (self[4] * self[13] - self[12] * self[5])
-              * (self[2] * self[11] - self[10] * self[3])
-              + (self[8] * self[13] - self[12] * self[9])
-              * (self[2] * self[7] - self[6] * self[3]))
+        return _determinant16(_values16(self))
 
     def Inverse(self):
         tmp = self.__class__()
-        d = self.Determinant();
-
-        if abs(d) < 0.001:
-            # No inverse, return identity
-            return tmp
+        values = _inverse16(_values16(self))
+        # No inverse, return identity
+        if values is not None:
+            tmp[:] = values
+        return tmp
+
+class PMBMatrixBuilder(object):
+    '''
+    Records a chain of transforms and applies them to a new matrix when
+    Build is called. Runs of the same transform are merged as they are
+    added so the matrix is only updated once for each run.
+    
+    M = FBMatrix.Builder().Translate(1, 0, 0).Translate(0, 2, 0).RotateY(0.5).Build()
+    '''
+    # matrix kernel for each transform {name : kernel}
+    _kKernels = {'Scale' : _scale16,
+                 'Translate' : _translate16,
+                 'RotateX' : _rotateX16,
+                 'RotateY' : _rotateY16,
+                 'RotateZ' : _rotateZ16,
+                 'RotateAxis' : _rotateAxis16,
+                 'RotateEuler' : _rotateEuler16}
+    
+    def __init__(self, matrixClass=FBMatrix):
+        '''
+        @param matrixClass: class of the matrix Build returns
+        '''
+        self._matrixClass = matrixClass
+        self._ops = []
+    
+    def _merge(self, name, args, merge):
+        '''Adds the transform, merging it into the last one if it is the same kind'''
+        ops = self._ops
+        if ops and ops[-1][0] == name:
+            ops[-1] = (name, merge(ops[-1][1], args))
         else:
-            d = 1.0 / d;
-
-            tmp[0] = d * (self[5] * (self[10] * self[15] - self[14] * self[11]) + self[9] * (self[14] * self[7] - self[6] * self[15]) + self[13] * (self[6] * self[11] - self[10] * self[7]));
-            tmp[4] = d * (self[6] * (self[8] * self[15] - self[12] * self[11]) + self[10] * (self[12] * self[7] - self[4] * self[15]) + self[14] * (self[4] * self[11] - self[8] * self[7]));
-            tmp[8] = d * (self[7] * (self[8] * self[13] - self[12] * self[9]) + self[11] * (self[12] * self[5] - self[4] * self[13]) + self[15] * (self[4] * self[9] - self[8] * self[5]));
-            tmp[12] = d * (self[4] * (self[13] * self[10] - self[9] * self[14]) + self[8] * (self[5] * self[14] - self[13] * self[6]) + self[12] * (self[9] * self[6] - self[5] * self[10]));
-            
-            tmp[1] = d * (self[9] * (self[2] * self[15] - self[14] * self[3]) + self[13] * (self[10] * self[3] - self[2] * self[11]) + self[1] * (self[14] * self[11] - self[10] * self[15]));
-            tmp[5] = d * (self[10] * (self[0] * self[15] - self[12] * self[3]) + self[14] * (self[8] * self[3] - self[0] * self[11]) + self[2] * (self[12] * self[11] - self[8] * self[15]));
-            tmp[9] = d * (self[11] * (self[0] * self[13] - self[12] * self[1]) + self[15] * (self[8] * self[1] - self[0] * self[9]) + self[3] * (self[12] * self[9] - self[8] * self[13]));
-            tmp[13] = d * (self[8] * (self[13] * self[2] - self[1] * self[14]) + self[12] * (self[1] * self[10] - self[9] * self[2]) + self[0] * (self[9] * self[14] - self[13] * self[10]));
-            
-            tmp[2] = d * (self[13] * (self[2] * self[7] - self[6] * self[3]) + self[1] * (self[6] * self[15] - self[14] * self[7]) + self[5] * (self[14] * self[3] - self[2] * self[15]));
-            tmp[6] = d * (self[14] * (self[0] * self[7] - self[4] * self[3]) + self[2] * (self[4] * self[15] - self[12] * self[7]) + self[6] * (self[12] * self[3] - self[0] * self[15]));
-            tmp[10] = d * (self[15] * (self[0] * self[5] - self[4] * self[1]) + self[3] * (self[4] * self[13] - self[12] * self[5]) + self[7] * (self[12] * self[1] - self[0] * self[13]));
-            tmp[14] = d * (self[12] * (self[5] * self[2] - self[1] * self[6]) + self[0] * (self[13] * self[6] - self[5] * self[14]) + self[4] * (self[1] * self[14] - self[13] * self[2]));
-            
-            tmp[3] = d * (self[1] * (self[10] * self[7] - self[6] * self[11]) + self[5] * (self[2] * self[11] - self[10] * self[3]) + self[9] * (self[6] * self[3] - self[2] * self[7]));
-            tmp[7] = d * (self[2] * (self[8] * self[7] - self[4] * self[11]) + self[6] * (self[0] * self[11] - self[8] * self[3]) + self[10] * (self[4] * self[3] - self[0] * self[7]));
-            tmp[11] = d * (self[3] * (self[8] * self[5] - self[4] * self[9]) + self[7] * (self[0] * self[9] - self[8] * self[1]) + self[11] * (self[4] * self[1] - self[0] * self[5]));
-            tmp[15] = d * (self[0] * (self[5] * self[10] - self[9] * self[6]) + self[4] * (self[9] * self[2] - self[1] * self[10]) + self[8] * (self[1] * self[6] - self[5] * self[2]));
-
-        return tmp;
+            ops.append((name, args))
+        return self
+    
+    def Scale(self, x, y, z):
+        return self._merge('Scale', (x, y, z),
+                           lambda a, b: (a[0] * b[0], a[1] * b[1], a[2] * b[2]))
+    
+    def Translate(self, x, y, z):
+        return self._merge('Translate', (x, y, z),
+                           lambda a, b: (a[0] + b[0], a[1] + b[1], a[2] + b[2]))
+    
+    def RotateX(self, angle):
+        return self._merge('RotateX', (angle,), lambda a, b: (a[0] + b[0],))
+    
+    def RotateY(self, angle):
+        return self._merge('RotateY', (angle,), lambda a, b: (a[0] + b[0],))
+    
+    def RotateZ(self, angle):
+        return self._merge('RotateZ', (angle,), lambda a, b: (a[0] + b[0],))
+    
+    def RotateAxis(self, angle, axis):
+        self._ops.append(('RotateAxis', (angle, axis)))
+        return self
+    
+    def RotateEuler(self, heading, attitude, bank):
+        self._ops.append(('RotateEuler', (heading, attitude, bank)))
+        return self
+    
+    def Build(self):
+        '''Returns a new matrix with all of the transforms applied in order'''
+        M = self._matrixClass()
+        if self._ops:
+            # the transforms are applied to a flat copy so the matrix is
+            # only read once and written once however long the chain is
+            kernels = self._kKernels
+            m = _values16(M)
+            for name, args in self._ops:
+                m = kernels[name](m, *args)
+            M[:] = m
+        return M
 
 class PMBVector2d(object):
     '''Base class for FBVector2d'''
     
+    __slots__ = ()
+    
     def __copy__(self):
         return self.__class__(self)
     
     Copy = __copy__
 
     def __eq__(self, other):
-        if isinstance(other, FBVector2d):
-            return self.X == other.X and \
-                   self.Y == other.Y
-        elif hasattr(other, '__len__') and len(other) == 2:
-            return self.X == other[0] and \
-                   self.Y == other[1]
+        if isinstance(other, FBVector2d) or \
+           (hasattr(other, '__len__') and len(other) == 2):
+            return self[0] == other[0] and \
+                   self[1] == other[1]
         else:
             raise Exception("Invalid vector length. Vector '%s' must have 2 items for comparison." % other)
 
@@ -369,95 +614,118 @@ class PMBVector2d(object):
         return not self.__eq__(other)
 
     def __nonzero__(self):
-        return self.X != 0 or self.Y != 0
-
-    def __iadd__(self, other):
-        if isinstance(other, FBVector2d):
-            self.X += other.X
-            self.Y += other.Y
-        else:
-            self.X += other[0]
-            self.Y += other[1]
+        return self[0] != 0 or self[1] != 0
+
+    __bool__ = __nonzero__
+
+    def AddVector(self, other):
+        '''
+        Adds the other vector to this one in place without any type checks
+        += is the same function
+        @param other: FBVector2d or (x, y) sequence
+        '''
+        self[0] += other[0]
+        self[1] += other[1]
         return self
     
-    def __isub__(self, other):
-        if isinstance(other, FBVector2d):
-            self.X -= other.X
-            self.Y -= other.Y
-        else:
-            self.X -= other[0]
-            self.Y -= other[1]
+    def SubtractVector(self, other):
+        '''
+        Subtracts the other vector from this one in place without any type checks
+        -= is the same function
+        @param other: FBVector2d or (x, y) sequence
+        '''
+        self[0] -= other[0]
+        self[1] -= other[1]
         return self
+    
+    def ScaleBy(self, value):
+        '''
+        Multiplies this vector in place by a number without any type checks
+        Use this over *= in loops where speed matters, *= checks the type first
+        @param value: number to multiply by
+        '''
+        self[0] *= value
+        self[1] *= value
+        return self
+
+    __iadd__ = AddVector
+    __isub__ = SubtractVector
 
     def __mul__(self, other):
-        if isinstance(other, (int, long, float)):
-            return self.__class__(self.X * other, self.Y * other)
+        if isinstance(other, _kNumericTypes):
+            return self.__class__(self[0] * other, self[1] * other)
         else:
             raise TypeError("Multiplier must be instance of (int, long, or float). '%s' given." % other.__class__.__name__)
 
     def __imul__(self, other):
-        if isinstance(other, (int, long, float)):
-            self.X *= other
-            self.Y *= other
-            return self
+        if isinstance(other, _kNumericTypes):
+            return self.ScaleBy(other)
         else:
             raise TypeError("Multiplier must be instance of (int, long, or float). '%s' given." % other.__class__.__name__)
 
-    def __div__(self, other):
-        if isinstance(other, (int, long, float)):
-            return self.__class__(operator.div(self.X, other), operator.div(self.Y, other))
-        else:
-            raise TypeError("Divider must be instance of (int, long, or float). '%s' given." % other.__class__.__name__)
-
     def __truediv__(self, other):
-        if isinstance(other, (int, long, float)):
-            return self.__class__(operator.truediv(self.X, other), operator.truediv(self.Y, other))
+        if isinstance(other, _kNumericTypes):
+            return self.__class__(self[0] / other, self[1] / other)
         else:
             raise TypeError("Divider must be instance of (int, long, or float). '%s' given." % other.__class__.__name__)
 
+    __div__ = __truediv__
+
     def __neg__(self):
-        return self.__class__(-self.X, -self.Y)
+        return self.__class__(-self[0], -self[1])
 
     def __abs__(self):
-        return math.sqrt(self.X ** 2 + self.Y ** 2)
+        x = self[0]
+        y = self[1]
+        return _sqrt(x * x + y * y)
     
     Magnitude = __abs__
 
     def MagnitudeSquared(self):
-        return self.X ** 2 + self.Y ** 2
+        x = self[0]
+        y = self[1]
+        return x * x + y * y
 
     def Normalize(self):
-        d = self.Magnitude()
+        x = self[0]
+        y = self[1]
+        d = _sqrt(x * x + y * y)
         if d:
-            self.X /= d
-            self.Y /= d
+            d = 1.0 / d
+            self[0] = x * d
+            self[1] = y * d
         return self
 
     def Normalized(self):
-        d = self.Magnitude()
+        x = self[0]
+        y = self[1]
+        d = _sqrt(x * x + y * y)
         if d:
-            return self.__class__(self.X / d, 
-                           self.Y / d)
-        return self.copy()
+            d = 1.0 / d
+            return self.__class__(x * d, y * d)
+        return self.Copy()
 
     def Dot(self, other):
         if isinstance(other, FBVector2d):
-            return self.X * other.X + \
-               self.Y * other.Y
+            return self[0] * other[0] + self[1] * other[1]
         else:
             raise TypeError("Object '%s' must be instance of FBVector2d." % other)
 
     def Cross(self):
-        return self.__class__(self.Y, -self.X)
+        '''Returns the perpendicular vector, this vector rotated 90 degrees clockwise'''
+        return self.__class__(self[1], -self[0])
 
     def Reflect(self, normal):
         # assume normal is normalized
         if isinstance(normal, FBVector2d):
-            d = 2 * (self.X * normal.X + self.Y * normal.Y)
-            return self.__class__(self.X - d * normal.X,
-                       self.Y - d * normal.Y)
+            x = self[0]
+            y = self[1]
+            nx = normal[0]
+            ny = normal[1]
+            d = 2 * (x * nx + y * ny)
+            return self.__class__(x - d * nx, y - d * ny)
         else:
-            raise TypeError("Object '%s' must be instance of FBVector2d." % other)
+            raise TypeError("Object '%s' must be instance of FBVector2d." % normal)
     
     @property
     def X(self):
@@ -479,20 +747,20 @@ class PMBVector2d(object):
 
 class PMBVector3d(object):
     '''Base class for FBVector3d'''
+    
+    __slots__ = ()
+    
     def __copy__(self):
         return self.__class__(self)
     
     Copy = __copy__
 
     def __eq__(self, other):
-        if isinstance(other, FBVector3d):
-            return self.X == other.X and \
-                   self.Y == other.Y and \
-                   self.Z == other.Z
-        elif hasattr(other, '__len__') and len(other) == 3:
-            return self.X == other[0] and \
-                   self.Y == other[1] and \
-                   self.Z == other[2]
+        if isinstance(other, FBVector3d) or \
+           (hasattr(other, '__len__') and len(other) == 3):
+            return self[0] == other[0] and \
+                   self[1] == other[1] and \
+                   self[2] == other[2]
         else:
             raise Exception("Invalid vector length. Vector '%s' must have 3 items for comparison." % other)
 
@@ -500,135 +768,173 @@ class PMBVector3d(object):
         return not self.__eq__(other)
 
     def __nonzero__(self):
-        return self.X != 0 or self.Y != 0 or self.Z != 0
+        return self[0] != 0 or self[1] != 0 or self[2] != 0
+
+    __bool__ = __nonzero__
+
+    # vectors and other sequences are both indexed directly rather than
+    # going through the X, Y, Z properties
+
+    def AddVector(self, other):
+        '''
+        Adds the other vector to this one in place without any type checks
+        += is the same function
+        @param other: FBVector3d or (x, y, z) sequence
+        '''
+        self[0] += other[0]
+        self[1] += other[1]
+        self[2] += other[2]
+        return self
 
-    def __iadd__(self, other):
-        if isinstance(other, FBVector3d):
-            self.X += other.X
-            self.Y += other.Y
-            self.Z += other.Z
-        else:
-            self.X += other[0]
-            self.Y += other[1]
-            self.Z += other[2]
+    def SubtractVector(self, other):
+        '''
+        Subtracts the other vector from this one in place without any type checks
+        -= is the same function
+        @param other: FBVector3d or (x, y, z) sequence
+        '''
+        self[0] -= other[0]
+        self[1] -= other[1]
+        self[2] -= other[2]
         return self
 
-    def __isub__(self, other):
-        if isinstance(other, FBVector3d):
-            self.X -= other.X
-            self.Y -= other.Y
-            self.Z -= other.Z
-        else:
-            self.X -= other[0]
-            self.Y -= other[1]
-            self.Z -= other[2]
+    def ScaleBy(self, value):
+        '''
+        Multiplies this vector in place by a number without any type checks
+        Use this over *= in loops where speed matters, *= checks the type first
+        @param value: number to multiply by
+        '''
+        self[0] *= value
+        self[1] *= value
+        self[2] *= value
         return self
+
+    __iadd__ = AddVector
+    __isub__ = SubtractVector
    
     def __mul__(self, other):
         if isinstance(other, FBVector3d):
-            copy = self.Copy()
-            return copy.Dot(other)
-        elif isinstance(other, (int, long, float)): 
-            return self.__class__(self.X * other,
-                           self.Y * other,
-                           self.Z * other)
+            return self.Dot(other)
+        elif isinstance(other, _kNumericTypes): 
+            return self.__class__(self[0] * other,
+                                  self[1] * other,
+                                  self[2] * other)
         else:
             raise TypeError("Multiplier must be instance of (int, long, or float). '%s' given." % other.__class__.__name__)
 
     def __imul__(self, other):
-        if isinstance(other, (int, long, float)):
-            self.X *= other
-            self.Y *= other
-            self.Z *= other
-            return self
+        if isinstance(other, _kNumericTypes):
+            return self.ScaleBy(other)
         else:
             raise TypeError("Multiplier must be instance of (int, long, or float). '%s' given." % other.__class__.__name__)
 
-    def __div__(self, other):
-        if type(other) in (int, long, float):
-            return self.__class__(operator.div(self.X, other),
-                       operator.div(self.Y, other),
-                       operator.div(self.Z, other))
-        else:
-            raise TypeError("Divider must be instance of (int, long, or float). '%s' given." % other.__class__.__name__)
-
     def __truediv__(self, other):
-        if type(other) in (int, long, float):
-            return self.__class__(operator.truediv(self.X, other),
-                       operator.truediv(self.Y, other),
-                       operator.truediv(self.Z, other))
+        if isinstance(other, _kNumericTypes):
+            return self.__class__(self[0] / other,
+                                  self[1] / other,
+                                  self[2] / other)
         else:
             raise TypeError("Divider must be instance of (int, long, or float). '%s' given." % other.__class__.__name__)
 
+    __div__ = __truediv__
+
     def __neg__(self):
-        return self.__class__(-self.X,
-                        -self.Y,
-                        -self.Z)
+        return self.__class__(-self[0], -self[1], -self[2])
 
     def __abs__(self):
-        return math.sqrt(self.X ** 2 + \
-                         self.Y ** 2 + \
-                         self.Z ** 2)
+        x = self[0]
+        y = self[1]
+        z = self[2]
+        return _sqrt(x * x + y * y + z * z)
     
     Magnitude = __abs__
 
     def MagnitudeSquared(self):
-        return self.X ** 2 + \
-               self.Y ** 2 + \
-               self.Z ** 2
+        x = self[0]
+        y = self[1]
+        z = self[2]
+        return x * x + y * y + z * z
 
     def Normalize(self):
-        d = self.Magnitude()
+        x = self[0]
+        y = self[1]
+        z = self[2]
+        d = _sqrt(x * x + y * y + z * z)
         if d:
-            self.X /= d
-            self.Y /= d
-            self.Z /= d
+            d = 1.0 / d
+            self[0] = x * d
+            self[1] = y * d
+            self[2] = z * d
         return self
 
     def Normalized(self):
-        d = self.Magnitude()
+        x = self[0]
+        y = self[1]
+        z = self[2]
+        d = _sqrt(x * x + y * y + z * z)
         if d:
-            return self.__class__(self.X / d, 
-                           self.Y / d, 
-                           self.Z / d)
+            d = 1.0 / d
+            return self.__class__(x * d, y * d, z * d)
         return self.Copy()
 
     def Dot(self, other):
         if isinstance(other, FBVector3d):
-            return self.X * other.X + \
-               self.Y * other.Y + \
-               self.Z * other.Z
+            return self[0] * other[0] + self[1] * other[1] + self[2] * other[2]
         else:
             raise TypeError("Object '%s' must be instance of FBVector3d." % other)
 
     def Cross(self, other):
         if isinstance(other, FBVector3d):
-            return self.__class__(self.Y * other.Z - self.Z * other.Y,
-                       -self.X * other.Z + self.Z * other.X,
-                       self.X * other.Y - self.Y * other.X)
+            ax = self[0]
+            ay = self[1]
+            az = self[2]
+            bx = other[0]
+            by = other[1]
+            bz = other[2]
+            return self.__class__(ay * bz - az * by,
+                                  az * bx - ax * bz,
+                                  ax * by - ay * bx)
         else:
             raise TypeError("Object '%s' must be instance of FBVector3d." % other)
         
     def Reflect(self, normal):
         # assume normal is normalized
         if isinstance(normal, FBVector3d):
-            d = 2 * (self.X * normal.X + self.Y * normal.Y + self.Z * normal.Z)
-            return self.__class__(self.X - d * normal.X,
-                       self.Y - d * normal.Y,
-                       self.Z - d * normal.Z)
+            x = self[0]
+            y = self[1]
+            z = self[2]
+            nx = normal[0]
+            ny = normal[1]
+            nz = normal[2]
+            d = 2 * (x * nx + y * ny + z * nz)
+            return self.__class__(x - d * nx,
+                                  y - d * ny,
+                                  z - d * nz)
         else:
             raise TypeError("Object '%s' must be instance of FBVector3d." % normal)
     
     def Angle(self, other):
         '''Returns angle between two Vectors.'''
-        if isinstance(normal, FBVector3d):
-            q = self.Normalized().Dot(other.Normalized())
+        if isinstance(other, FBVector3d):
+            ax = self[0]
+            ay = self[1]
+            az = self[2]
+            bx = other[0]
+            by = other[1]
+            bz = other[2]
+            # dot / (|a| * |b|) takes one square root instead of normalizing
+            # both vectors first
+            m2 = (ax * ax + ay * ay + az * az) * (bx * bx + by * by + bz * bz)
+            if m2:
+                q = (ax * bx + ay * by + az * bz) / _sqrt(m2)
+            else:
+                # a zero length vector has a zero dot like the normalized copies did
+                q = 0.0
             if q < -1.0:
                 return math.pi
             elif q > 1.0:
                 return 0.0
             else:
-                return math.acos(q)
+                return _acos(q)
         else:
             raise TypeError("Object '%s' must be instance of FBVector3d." % other)
     